@@ -1,84 +1,214 @@
 # ======= USER SETTINGS (edit as needed) =======================================
-Ned = 882.78         # kN  (design axial load)
+Ned = 882.78         # kN  (design axial load per column; per storey when STACK_LOADS is on)
 gamma_mo = 1.45      # material safety factor (used in Nrd formula)
 fc_default = 35.0    # N/mm^2 (used if concrete strength isn't found)
 MODEL_PATH = "25-16-D-STR.ifc"
-STOREY_MATCH = "Level -1"  # match storey Name/LongName containing this text (e.g., "Level -1")
+STOREY_MATCH = "Level -1"  # match storey Name/LongName containing this text (e.g., "Level -1"); None = all storeys
+OUTPUT_FORMATS = ["text"]  # any of "text", "jsonl", "csv" (written next to the report)
+CACHE_PATH = "capacity_cache.sqlite"  # per-column extraction cache (reruns skip IFC parsing); None = off
+WRITE_PROFILE = True  # stage timings + fallback-path counters as <report>.profile.json
+CPROFILE = False      # also dump a cProfile of the run to <report>.cprofile
+SLAB_LOAD = None     # kN/m² design floor load; Ned = tributary slab area × SLAB_LOAD per column (None = Ned for all)
+BUCKLING = True      # also check flexural buckling (column length from the extrusion depth)
+BUCKLING_K = 1.0     # effective length factor: L0 = BUCKLING_K × L (1.0 = pinned at both ends)
+STACK_LOADS = False  # add the load of the columns stacked above (Ned / slab load per storey, summed down each stack)
+MATERIAL_RULES_PATH = None  # JSON material classification table (same shape as MATERIAL_CLASS_RULES); None = built-in
 # ==============================================================================
 
+import os
+import sys
+import re
+import csv
+import argparse
+import json
 import math
-from contextlib import redirect_stdout
+import time
+import sqlite3
+import hashlib
+import cProfile
+from array import array
+from functools import lru_cache
+from contextlib import contextmanager
+from typing import NamedTuple, Optional, Tuple
+import numpy as np
 import ifcopenshell
 
-# Geometry as fallback, bounding box, if profile data is missing
-try:
-    import ifcopenshell.geom as geom
-    GEOM_OK = True
-except Exception:
-    GEOM_OK = False
+# Geometry as fallback, bounding box, if profile data is missing.
+# The engine is imported on first use only (see _geom()); None = not tried yet.
+GEOM_OK = None
+_GEOM = None
 
 A_SANITY_EDGE_M = 5.0  # if dimensions > 5 m → use bounding box asfallback
+GEOM_THREADS = os.cpu_count() or 1  # cores used by the batched bounding-box stage
+EVAL_CHUNK = 2000  # columns per evaluation chunk (bounds memory, still batches geometry)
+
+# ---------- Configuration ----------
+class CheckConfig(NamedTuple):
+    """Design parameters and output options for one capacity check."""
+    Ned: float                      # kN  (design axial load)
+    gamma_mo: float                 # material safety factor
+    fc_default: float               # N/mm^2 (used if concrete strength isn't found)
+    slab_load: Optional[float]      # kN/m² on tributary slab area; None = Ned for every column
+    stack_loads: bool               # accumulate loads down vertical column stacks
+    buckling: bool                  # flexural buckling check next to the axial one
+    buckling_k: float               # effective length factor
+    storey_match: Optional[str]     # storey Name/LongName text; None = all storeys
+    output_formats: Tuple[str, ...] # any of "text", "jsonl", "csv"
+    cache_path: Optional[str]       # extraction cache; None = off
+    write_profile: bool             # <report>.profile.json
+    cprofile: bool                  # <report>.cprofile
+
+def default_config(**overrides):
+    """CheckConfig from the USER SETTINGS at the top of this file, with `overrides` applied."""
+    return CheckConfig(
+        Ned=Ned, gamma_mo=gamma_mo, fc_default=fc_default, slab_load=SLAB_LOAD, stack_loads=STACK_LOADS,
+        buckling=BUCKLING, buckling_k=BUCKLING_K, storey_match=STOREY_MATCH,
+        output_formats=tuple(OUTPUT_FORMATS), cache_path=CACHE_PATH,
+        write_profile=WRITE_PROFILE, cprofile=CPROFILE,
+    )._replace(**overrides)
+
+# ---------- Instrumentation ----------
+def new_perf():
+    """Stage timers (seconds) and path counters for one run."""
+    return {"stages": {}, "counts": {}}
+
+def add_time(perf, stage_name, seconds):
+    perf["stages"][stage_name] = perf["stages"].get(stage_name, 0.0) + seconds
+
+def count(perf, key, n=1):
+    perf["counts"][key] = perf["counts"].get(key, 0) + n
+
+@contextmanager
+def stage(perf, name):
+    """Accumulate the wall time of a block under `name`."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_time(perf, name, time.perf_counter() - t0)
+
+def write_perf(perf, path, **extra):
+    """Machine-readable profile (JSON): stage timings, path counters and `extra` fields."""
+    out = dict(extra)
+    out["stages"] = {k: round(v, 6) for k, v in perf["stages"].items()}
+    out["counts"] = dict(sorted(perf["counts"].items()))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(out, f, indent=2)
 
 # ---------- Units ----------
+_SI_PREFIX = {None: 1.0, "MILLI": 1e-3, "CENTI": 1e-2, "DECI": 1e-1, "KILO": 1e3}
+_UNIT_POWER = {"LENGTHUNIT": 1, "AREAUNIT": 2, "VOLUMEUNIT": 3}
+
+def _named_unit_scale(u):
+    """SI scale of an IfcSIUnit / IfcConversionBasedUnit (None if unknown)."""
+    try:
+        if u.is_a("IfcSIUnit"):
+            return _SI_PREFIX.get(u.Prefix, 1.0) ** _UNIT_POWER.get(u.UnitType, 1)  # mm² = (1e-3)²
+        if u.is_a("IfcConversionBasedUnit"):
+            mu = u.ConversionFactor
+            vc = getattr(mu.ValueComponent, "wrappedValue", mu.ValueComponent)
+            return float(vc) * (_named_unit_scale(mu.UnitComponent) or 1.0)
+    except Exception:
+        pass
+    return None
+
+def unit_scale(model, unit_type):
+    """Scale from the project's `unit_type` (e.g. "AREAUNIT") to SI; 1.0 if not assigned."""
+    for ua in model.by_type("IfcUnitAssignment")[:1]:
+        for u in ua.Units or []:
+            if getattr(u, "UnitType", None) == unit_type:
+                return _named_unit_scale(u) or 1.0
+    return 1.0
+
 def length_unit_scale_to_m(model):
     """Return scale from model length unit to meters."""
-    scale = 1.0
-    uas = model.by_type("IfcUnitAssignment")
-    if not uas:
-        return scale
-    for u in uas[0].Units or []:
-        if u.is_a("IfcSIUnit") and u.UnitType == "LENGTHUNIT" and u.Name == "METRE":
-            pref = getattr(u, "Prefix", None)
-            return {None:1.0,"MILLI":1e-3,"CENTI":1e-2,"DECI":1e-1,"KILO":1e3}.get(pref,1.0)
-        if u.is_a("IfcConversionBasedUnit") and u.UnitType == "LENGTHUNIT":
-            mu = u.ConversionFactor
-            if mu and hasattr(mu, "ValueComponent") and hasattr(mu, "UnitComponent"):
-                vc = getattr(mu.ValueComponent, "wrappedValue", mu.ValueComponent)
-                si = mu.UnitComponent
-                if si and si.is_a("IfcSIUnit") and si.Name == "METRE":
-                    pref = getattr(si, "Prefix", None)
-                    si_to_m = {None:1.0,"MILLI":1e-3,"CENTI":1e-2,"DECI":1e-1,"KILO":1e3}.get(pref,1.0)
-                    try:
-                        return float(vc) * float(si_to_m)
-                    except Exception:
-                        pass
-    return scale
+    return unit_scale(model, "LENGTHUNIT")
 
 # ---------- Spatial ----------
-def climb_to_storey(spatial):
-    """Climb up the spatial tree to the nearest IfcBuildingStorey."""
-    cur = spatial
-    visited = set()
-    while cur and cur.id() not in visited:
-        visited.add(cur.id())
-        if cur.is_a("IfcBuildingStorey"):
-            return cur
-        decomp = getattr(cur, "Decomposes", None)
-        if decomp:
-            rel_up = list(decomp)[0]
-            cur = rel_up.RelatingObject
-        else:
-            return None
-    return None
+def storey_match_text(storey):
+    """The text storey filters search: Name and LongName together."""
+    return str(getattr(storey, "Name", "") or "") + " " + str(getattr(storey, "LongName", "") or "")
+
+def is_storey_match(storey, match=None):
+    """Check if storey name/longname contains the STOREY_MATCH string (or `match`)."""
+    match = STOREY_MATCH if match is None else match
+    if match is None:
+        return True  # all-storeys mode
+    return match.lower() in storey_match_text(storey).lower()
+
+STOREY_PLACE_TOL_M = 0.05  # a column base this far below a storey level still counts as on it
+PLACE_UNCONTAINED = ("IfcColumn",)  # element types without containment assigned to a storey by elevation
 
-def element_storey(element):
-    """Get the IfcBuildingStorey an element is contained in."""
-    for rel in (element.ContainedInStructure or []):
-        if rel.is_a("IfcRelContainedInSpatialStructure"):
-            st = rel.RelatingStructure
-            if not st:
+def build_spatial_index(model, place_uncontained=PLACE_UNCONTAINED):
+    """
+    One pass over IfcRelAggregates / IfcRelContainedInSpatialStructure.
+    Returns a dict:
+      - "storeys":   {storey_id: IfcBuildingStorey}
+      - "storey_of": {element_id: IfcBuildingStorey}
+      - "elements":  {storey_id: [contained elements]}
+      - "placed":    {element_id: IfcBuildingStorey} for the `place_uncontained` elements that
+                     have no containment and were assigned by elevation (see place_by_elevation)
+    """
+    parent = {}
+    for rel in model.by_type("IfcRelAggregates"):
+        up = rel.RelatingObject
+        if not up:
+            continue
+        for ch in (rel.RelatedObjects or []):
+            parent.setdefault(ch.id(), up)
+
+    storeys = {st.id(): st for st in model.by_type("IfcBuildingStorey")}
+    resolved = {}  # spatial id -> storey (or None), shared by all elements
+
+    def resolve(spatial):
+        chain, cur = [], spatial
+        while cur is not None and cur.id() not in resolved:
+            if cur.id() in storeys:
+                resolved[cur.id()] = cur
+                break
+            if cur.id() in chain:  # cyclic decomposition
+                resolved[cur.id()] = None
+                break
+            chain.append(cur.id())
+            cur = parent.get(cur.id())
+        st = resolved.get(cur.id()) if cur is not None else None
+        for sid in chain:
+            resolved[sid] = st
+        return st
+
+    storey_of, elements = {}, {}
+    for rel in model.by_type("IfcRelContainedInSpatialStructure"):
+        st = resolve(rel.RelatingStructure) if rel.RelatingStructure else None
+        if not st:
+            continue
+        for el in (rel.RelatedElements or []):
+            if el.id() in storey_of:
                 continue
-            if st.is_a("IfcBuildingStorey"):
-                return st
-            up = climb_to_storey(st)
-            if up:
-                return up
-    return None
+            storey_of[el.id()] = st
+            elements.setdefault(st.id(), []).append(el)
+    index = {"storeys": storeys, "storey_of": storey_of, "elements": elements, "placed": {}}
+    loose = [el for t in place_uncontained for el in model.by_type(t) if el.id() not in storey_of]
+    if loose and storeys:
+        for el, st in zip(loose, place_by_elevation(model, loose, storeys.values())):
+            storey_of[el.id()] = index["placed"][el.id()] = st
+            elements.setdefault(st.id(), []).append(el)
+    return index
 
-def is_storey_match(storey):
-    """Check if storey name/longname contains the STOREY_MATCH string."""
-    txt = (str(getattr(storey, "Name", "") or "") + " " + str(getattr(storey, "LongName", "") or "")).lower()
-    return STOREY_MATCH.lower() in txt
+def place_by_elevation(model, elements, storeys):
+    """
+    Storey of each element by its base elevation: the highest storey level at or below it
+    (binary search over the sorted levels; below the lowest storey -> lowest storey).
+    Levels are the storeys' placed elevations, else their Elevation attribute.
+    """
+    memo = {}
+    storeys = list(storeys)
+    levels = np.array([placement_matrix(st.ObjectPlacement, memo)[2, 3] if st.ObjectPlacement is not None
+                       else (_f(getattr(st, "Elevation", None)) or 0.0) for st in storeys])
+    order = np.argsort(levels, kind="stable")
+    z = placement_matrices([el.ObjectPlacement for el in elements], memo)[:, 2, 3]
+    tol = STOREY_PLACE_TOL_M / length_unit_scale_to_m(model)
+    i = np.searchsorted(levels[order], z + tol, side="right") - 1
+    return [storeys[k] for k in order[np.maximum(i, 0)]]
 
 # ---------- Material helpers ----------
 def _relating_material(el):
@@ -130,25 +260,93 @@ def _material_names_from_def(matdef):
             seen.add(n); out.append(n)
     return out
 
+# ---------- Material classification ----------
+# Class -> {"words": {language: [...]}, "patterns": {standard: [regex, ...]}}; earlier classes win.
+# Words match whole words only; a trailing "*" also matches compounds ("betong*" -> "betongsøyle").
+# Patterns are regexes on the lowercased names, also bounded by non-alphanumerics.
+MATERIAL_CLASS_RULES = {
+    "Concrete": {
+        "words": {"en": ["concrete"], "no": ["betong*"]},
+        "patterns": {"EN 206": [r"l?c\d{1,3}\s*/\s*\d{2,3}", r"c(?:20|25|30|35|40|45|50)"]},
+    },
+    "Steel": {
+        "words": {"en": ["steel"], "no": ["stål*"]},
+        "patterns": {"EN 10025": [r"s(?:235|275|355|420|460|500|550|620|690)[a-z0-9+]*"]},
+    },
+    "Wood": {
+        "words": {"en": ["wood", "timber", "glulam", "lvl", "clt"], "no": ["tre", "limtre", "massivtre"],
+                  "brand": ["kerto"]},
+        "patterns": {"EN 338": [r"c(?:14|16|18|22|24|27)", r"d(?:18|24|27|30|35|40|45|50|55|60|65|70|75|80)"],
+                     "EN 14080": [r"gl\s*\d{2}[hc]?"]},
+    },
+    "Masonry": {"words": {"en": ["masonry", "brick", "block"], "no": ["mur*", "tegl*"]}},
+    "Aluminium": {"words": {"en": ["aluminium", "aluminum", "alu"]}},
+    "Glass": {"words": {"en": ["glass"], "no": ["glass"]}},
+    "Gypsum": {"words": {"en": ["gypsum"], "no": ["gips*"]}},
+    "Insulation": {"words": {"en": ["insulation", "xps", "eps", "rockwool", "mineral wool"], "no": ["isolasjon*"]}},
+    "Plastic": {"words": {"en": ["hdpe", "pp", "pvc", "plastic"], "no": ["plast*"]}},
+    "Asphalt": {"words": {"en": ["asphalt"], "no": ["asfalt*"]}},
+}
+
+_ALNUM_BEFORE = r"(?<![^\W_])"
+_ALNUM_AFTER = r"(?![^\W_])"
+_MATERIAL_MATCHER = None  # (compiled regex, [class per named group])
+
+def compile_material_rules(rules):
+    """One regex with a named group per class; returns (regex, class names in priority order)."""
+    classes, alts = [], []
+    for i, (cls, spec) in enumerate(rules.items()):
+        parts = []
+        for words in (spec.get("words") or {}).values():
+            for w in words:
+                w = w.lower()
+                if w.endswith("*"):
+                    parts.append(re.escape(w[:-1]))
+                else:
+                    parts.append(re.escape(w) + _ALNUM_AFTER)
+        for pats in (spec.get("patterns") or {}).values():
+            parts.extend(f"(?:{p}){_ALNUM_AFTER}" for p in pats)
+        if parts:
+            alts.append(f"(?P<m{i}>{_ALNUM_BEFORE}(?:{'|'.join(parts)}))")
+        classes.append(cls)
+    return re.compile("|".join(alts) or r"(?!)"), classes
+
+def use_material_rules(rules=None):
+    """Switch the classification table (dict, JSON path, or None = MATERIAL_RULES_PATH / built-in)."""
+    global _MATERIAL_MATCHER
+    if rules is None:
+        rules = MATERIAL_RULES_PATH or MATERIAL_CLASS_RULES
+    if isinstance(rules, str):
+        with open(rules, encoding="utf-8") as f:
+            rules = json.load(f)
+    _MATERIAL_MATCHER = compile_material_rules(rules)
+    classify_material.cache_clear()
+
+def material_rules_digest():
+    """Digest of the active compiled classification table (part of the extraction cache key)."""
+    if _MATERIAL_MATCHER is None:
+        use_material_rules()
+    rx, classes = _MATERIAL_MATCHER
+    return hashlib.sha256("\0".join([rx.pattern, *classes]).encode("utf-8")).hexdigest()[:16]
+
+@lru_cache(maxsize=None)
+def classify_material(names):
+    """Material class (Concrete/Steel/Wood/...) for a tuple of material names; memoized."""
+    if _MATERIAL_MATCHER is None:
+        use_material_rules()
+    rx, classes = _MATERIAL_MATCHER
+    best = None
+    for m in rx.finditer(" ".join(n.lower() for n in names)):
+        i = int(m.lastgroup[1:])
+        if best is None or i < best:
+            best = i
+            if i == 0:
+                break
+    return classes[best] if best is not None else "Unknown"
+
 def _normalize_material_class(names):
     """Roughly classify material into Concrete/Steel/Wood/... based on names."""
-    text = " ".join(n.lower() for n in (names or []))
-    rules = [
-        ("Concrete", ["betong","concrete","c20","c25","c30","c35","c40","c45","c50"]),
-        ("Steel",    ["stål","steel","s235","s275","s355","s420","s460"]),
-        ("Wood",     ["tre","wood","timber","glulam","lvl","kerto","c24"]),
-        ("Masonry",  ["mur","masonry","brick","block","tegl"]),
-        ("Aluminium",["aluminium","aluminum","alu"]),
-        ("Glass",    ["glass"]),
-        ("Gypsum",   ["gips","gypsum"]),
-        ("Insulation",["isolasjon","insulation","xps","eps","rockwool","mineral wool"]),
-        ("Plastic",  ["plast","hdpe","pp","pvc"]),
-        ("Asphalt",  ["asfalt","asphalt"]),
-    ]
-    for cls, keys in rules:
-        if any(k in text for k in keys):
-            return cls
-    return "Unknown"
+    return classify_material(tuple(names or ()))
 
 # ---------- fc from structured IFC properties ----------
 def _unwrap_val(v):
@@ -259,7 +457,6 @@ def extract_fc_from_name(names, mcls):
     """
     if mcls != "Concrete" or not names:
         return None
-    import re
     text = " ".join(str(n) for n in names).upper()
     m = re.search(r"\bC\s*([0-9]{2})(?:\s*/\s*[0-9]{2})?\b", text)
     if m:
@@ -269,12 +466,11 @@ def extract_fc_from_name(names, mcls):
             return None
     return None
 
-def get_material_info_with_fc(el):
+def _resolve_material(md):
     """
-    Returns: (material_names, material_class, fc_value, fc_source)
-      - fc_source ∈ {'pset', 'name', 'default', None}
+    Resolve one material definition from scratch.
+    Returns (names, material_class, fc_or_None, fc_source); fc None means 'use the default'.
     """
-    md = _relating_material(el)
     names = _material_names_from_def(md)
     mcls = _normalize_material_class(names)
 
@@ -288,8 +484,61 @@ def get_material_info_with_fc(el):
     if fc is not None:
         return names, mcls, fc, "name"
 
-    # 3) Final fallback to default
-    return names, mcls, fc_default, "default"
+    # 3) Final fallback to default (filled in by the caller)
+    return names, mcls, None, "default"
+
+# ---------- Material cache ----------
+def new_material_cache():
+    """Empty material resolution cache; create one per model run."""
+    return {"entries": {}, "types": {}, "hits": 0, "misses": 0}
+
+def _material_cache_key(md):
+    """Each definition is its own entry: a usage also reads its set's profile/layer material psets."""
+    return md.id() if md else None
+
+def _cached_material_for_def(md, cache):
+    """Cache lookup keyed by the material definition entity id."""
+    key = _material_cache_key(md)
+    entry = cache["entries"].get(key)
+    if entry is not None:
+        cache["hits"] += 1
+        return entry
+    cache["misses"] += 1
+    entry = _resolve_material(md)
+    cache["entries"][key] = entry
+    return entry
+
+def _cached_material(el, cache):
+    """Same lookup order as _relating_material(), but type-level materials are also keyed by the type."""
+    for rel in (el.HasAssociations or []):
+        if rel.is_a("IfcRelAssociatesMaterial"):
+            return _cached_material_for_def(rel.RelatingMaterial, cache)
+    for t_rel in (el.IsTypedBy or []):
+        t = t_rel.RelatingType
+        entry = cache["types"].get(t.id())
+        if entry is not None:
+            cache["hits"] += 1
+            return entry
+        for rel in (t.HasAssociations or []):
+            if rel.is_a("IfcRelAssociatesMaterial"):
+                entry = _cached_material_for_def(rel.RelatingMaterial, cache)
+                cache["types"][t.id()] = entry
+                return entry
+    return _cached_material_for_def(None, cache)
+
+def get_material_info_with_fc(el, cache=None, fc_default_value=None):
+    """
+    Returns: (material_names, material_class, fc_value, fc_source)
+      - fc_source ∈ {'pset', 'name', 'default', None}
+    Pass a cache from new_material_cache() so each unique material is parsed once.
+    """
+    if cache is None:
+        names, mcls, fc, fc_src = _resolve_material(_relating_material(el))
+    else:
+        names, mcls, fc, fc_src = _cached_material(el, cache)
+    if fc is None:
+        fc = fc_default if fc_default_value is None else fc_default_value
+    return names, mcls, fc, fc_src
 
 # ---------- Profile / Dimensions / Area ----------
 def get_material_profiledef(el):
@@ -322,8 +571,8 @@ def get_material_profiledef(el):
                         if mp.Profile: return mp.Profile
     return None
 
-def get_extruded_profiledef(el):
-    """Find IfcProfileDef via product representation (IfcExtrudedAreaSolid.SweptArea)."""
+def get_swept_solid(el):
+    """First IfcExtrudedAreaSolid / IfcFixedReferenceSweptAreaSolid with a profile, on instance or type."""
     def scan_rep(rep):
         if not rep: return None
         for cr in (rep.Representations or []):
@@ -331,22 +580,196 @@ def get_extruded_profiledef(el):
                 if it.is_a("IfcExtrudedAreaSolid") or it.is_a("IfcFixedReferenceSweptAreaSolid"):
                     sa = getattr(it, "SweptArea", None)
                     if sa and sa.is_a("IfcProfileDef"):
-                        return sa
+                        return it
         return None
-    prof = scan_rep(el.Representation)
-    if prof: return prof
+    solid = scan_rep(el.Representation)
+    if solid: return solid
     for t_rel in (el.IsTypedBy or []):
-        prof = scan_rep(getattr(t_rel.RelatingType, "Representation", None))
-        if prof: return prof
+        solid = scan_rep(getattr(t_rel.RelatingType, "Representation", None))
+        if solid: return solid
     return None
 
+def get_extruded_profiledef(el):
+    """Find IfcProfileDef via product representation (IfcExtrudedAreaSolid.SweptArea)."""
+    solid = get_swept_solid(el)
+    return solid.SweptArea if solid else None
+
+def get_extrusion_depth(el, to_m):
+    """Column length (m) from IfcExtrudedAreaSolid.Depth; None if not extruded."""
+    solid = get_swept_solid(el)
+    depth = _f(getattr(solid, "Depth", None)) if solid else None
+    return depth * to_m if depth else None
+
 def _f(x):
     try: return float(x)
     except: return None
 
+# ---------- Profile geometry (analytic) ----------
+# Arbitrary / composite / derived profiles without the geometry kernel. Areas use Green's
+# theorem, G = ∮ x dy - y dx = 2·A: NumPy shoelace terms for straight runs, exact terms for arcs.
+ARC_SAMPLES = 16  # points kept per arc (plus its axis extremes) for the extent; the area term is exact
+
+def _xy(coords):
+    return np.asarray(coords, dtype=float).reshape(len(coords), -1)[:, :2]
+
+def _arc(p1, p2, p3):
+    """(G along the arc p1 -> p2 -> p3, points along it); a straight run if collinear."""
+    d = 2.0 * (p1[0]*(p2[1]-p3[1]) + p2[0]*(p3[1]-p1[1]) + p3[0]*(p1[1]-p2[1]))
+    if abs(d) < 1e-12:
+        pts = np.array([p1, p3])
+        return p1[0]*p3[1] - p3[0]*p1[1], pts
+    s1, s2, s3 = p1 @ p1, p2 @ p2, p3 @ p3
+    c = np.array([s1*(p2[1]-p3[1]) + s2*(p3[1]-p1[1]) + s3*(p1[1]-p2[1]),
+                  s1*(p3[0]-p2[0]) + s2*(p1[0]-p3[0]) + s3*(p2[0]-p1[0])]) / d
+    r = float(np.hypot(*(p1 - c)))
+    a1, a2, a3 = (math.atan2(p[1]-c[1], p[0]-c[0]) for p in (p1, p2, p3))
+    sweep = (a3 - a1) % (2*math.pi)
+    if (a2 - a1) % (2*math.pi) > sweep:  # p2 not on the counter-clockwise run: clockwise arc
+        sweep -= 2*math.pi
+    G = r*r*sweep + (c[0]*(p3[1]-p1[1]) - c[1]*(p3[0]-p1[0]))
+    t = a1 + sweep*np.linspace(0.0, 1.0, ARC_SAMPLES)
+    lo, hi = sorted((a1, a1 + sweep))
+    quads = np.arange(math.ceil(lo / (math.pi/2)), math.floor(hi / (math.pi/2)) + 1) * (math.pi/2)
+    t = np.sort(np.concatenate([t, quads]))[::1 if sweep > 0 else -1]
+    return G, c + r*np.column_stack([np.cos(t), np.sin(t)])
+
+def _polyline_G(pts):
+    x, y = pts[:, 0], pts[:, 1]
+    return float(np.sum(x[:-1]*y[1:] - x[1:]*y[:-1]))
+
+def _curve(curve):
+    """(G along a 2D curve, its points in order) for polylines, indexed polycurves (with arcs),
+    composite curves of those, and full circles / ellipses; None for anything else."""
+    if curve.is_a("IfcPolyline"):
+        pts = _xy([p.Coordinates for p in curve.Points])
+        return _polyline_G(pts), pts
+    if curve.is_a("IfcIndexedPolyCurve"):
+        coords = _xy(curve.Points.CoordList)
+        if not curve.Segments:
+            return _polyline_G(coords), coords
+        G, parts = 0.0, []
+        for seg in curve.Segments:
+            idx = np.asarray(seg.wrappedValue, dtype=int) - 1
+            if seg.is_a("IfcArcIndex"):
+                g, pts = _arc(*coords[idx])
+            else:
+                pts = coords[idx]
+                g = _polyline_G(pts)
+            G += g
+            parts.append(pts)
+        return G, np.vstack(parts)
+    if curve.is_a("IfcCompositeCurve"):
+        G, parts = 0.0, []
+        for seg in curve.Segments:
+            sub = _curve(seg.ParentCurve) if getattr(seg, "ParentCurve", None) else None
+            if sub is None:
+                return None
+            g, pts = sub
+            if getattr(seg, "SameSense", True) is False:
+                g, pts = -g, pts[::-1]
+            G += g
+            parts.append(pts)
+        return G, np.vstack(parts)
+    if curve.is_a("IfcCircle") or curve.is_a("IfcEllipse"):
+        a = _f(getattr(curve, "Radius", None) or getattr(curve, "SemiAxis1", None))
+        b = _f(getattr(curve, "Radius", None) or getattr(curve, "SemiAxis2", None))
+        if not a or not b:
+            return None
+        pos = getattr(curve, "Position", None)
+        c = _xy([pos.Location.Coordinates])[0] if pos is not None and pos.Location else np.zeros(2)
+        t = np.linspace(0.0, 2*math.pi, 4*ARC_SAMPLES)
+        pts = c + np.column_stack([a*np.cos(t), b*np.sin(t)])  # extent ignores the ellipse rotation
+        return 2*math.pi*a*b, pts
+    return None
+
+def _closed_area(curve):
+    """(area, points) enclosed by a closed curve (the closing chord is added if needed)."""
+    res = _curve(curve)
+    if res is None or len(res[1]) < 2:
+        return None
+    G, pts = res
+    G += pts[-1][0]*pts[0][1] - pts[0][0]*pts[-1][1]
+    return abs(G) / 2.0, pts
+
+def _operator_2d(op):
+    """(origin, u, v) of an IfcCartesianTransformationOperator2D(nonUniform); u, v include the scales."""
+    o = _xy([op.LocalOrigin.Coordinates])[0] if getattr(op, "LocalOrigin", None) else np.zeros(2)
+    u = np.asarray(op.Axis1.DirectionRatios[:2], dtype=float) if getattr(op, "Axis1", None) else np.array([1.0, 0.0])
+    u = u / (np.hypot(*u) or 1.0)
+    if getattr(op, "Axis2", None):
+        v = np.asarray(op.Axis2.DirectionRatios[:2], dtype=float)
+        v = v / (np.hypot(*v) or 1.0)
+    else:
+        v = np.array([-u[1], u[0]])
+    s1 = _f(getattr(op, "Scale", None)) or 1.0
+    s2 = _f(getattr(op, "Scale2", None)) or s1
+    return o, u*s1, v*s2
+
+def _placement_2d(pos):
+    """(origin, x axis, y axis) of an optional IfcAxis2Placement2D."""
+    if pos is None:
+        return np.zeros(2), np.array([1.0, 0.0]), np.array([0.0, 1.0])
+    o = _xy([pos.Location.Coordinates])[0] if pos.Location else np.zeros(2)
+    u = np.asarray(pos.RefDirection.DirectionRatios[:2], dtype=float) if getattr(pos, "RefDirection", None) else np.array([1.0, 0.0])
+    u = u / (np.hypot(*u) or 1.0)
+    return o, u, np.array([-u[1], u[0]])
+
+def profile_points(profile):
+    """Points spanning a profile's outline, in profile units (for its extent); None if unknown."""
+    if profile.is_a("IfcArbitraryClosedProfileDef"):
+        res = _closed_area(profile.OuterCurve)
+        return res[1] if res else None
+    if profile.is_a("IfcCompositeProfileDef"):
+        parts = [profile_points(p) for p in (profile.Profiles or [])]
+        return np.vstack(parts) if parts and all(p is not None for p in parts) else None
+    if profile.is_a("IfcDerivedProfileDef"):
+        pts = profile_points(profile.ParentProfile)
+        if pts is None:
+            return None
+        o, u, v = _operator_2d(profile.Operator)
+        return o + pts[:, :1]*u + pts[:, 1:]*v
+    wh = width_height_from_profile(profile, 1.0)
+    if not wh:
+        return None
+    o, u, v = _placement_2d(getattr(profile, "Position", None))
+    corners = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]]) * (np.asarray(wh) / 2.0)
+    return o + corners[:, :1]*u + corners[:, 1:]*v
+
+def profile_area(profile):
+    """Exact area (profile units²) of arbitrary / voided / composite / derived profiles; None if unknown."""
+    if profile.is_a("IfcArbitraryClosedProfileDef"):
+        outer = _closed_area(profile.OuterCurve)
+        if outer is None:
+            return None
+        A = outer[0]
+        for inner in (getattr(profile, "InnerCurves", None) or []):  # IfcArbitraryProfileDefWithVoids
+            hole = _closed_area(inner)
+            if hole is None:
+                return None
+            A -= hole[0]
+        return float(A)
+    if profile.is_a("IfcCompositeProfileDef"):
+        areas = [area_from_profile(p, 1.0) for p in (profile.Profiles or [])]
+        return sum(a for a, _ in areas) if areas and all(a is not None and ok for a, ok in areas) else None
+    if profile.is_a("IfcDerivedProfileDef"):
+        A, ok = area_from_profile(profile.ParentProfile, 1.0)
+        if A is None or not ok:
+            return None
+        _, u, v = _operator_2d(profile.Operator)
+        return float(A * abs(u[0]*v[1] - u[1]*v[0]))
+    return None
+
+_OUTLINE_PROFILES = ("IfcArbitraryClosedProfileDef", "IfcCompositeProfileDef", "IfcDerivedProfileDef")
+
 def width_height_from_profile(profile, to_m):
     """Return (w_m, h_m) from common IfcProfileDef types, scaled to meters."""
     if not profile: return None
+    # Arbitrary / composite / derived: extent of the analytic outline
+    if any(profile.is_a(t) for t in _OUTLINE_PROFILES):
+        pts = profile_points(profile)
+        if pts is None or not len(pts): return None
+        ext = pts.max(axis=0) - pts.min(axis=0)
+        return (float(ext[0])*to_m, float(ext[1])*to_m) if ext.all() else None
     # Rectangle / rounded rectangle
     if profile.is_a("IfcRectangleProfileDef") or profile.is_a("IfcRoundedRectangleProfileDef"):
         x, y = _f(profile.XDim), _f(profile.YDim)
@@ -437,127 +860,1553 @@ def area_from_profile(profile, to_m):
             A = 2*b*tf + (h-2*tf)*tw
             return A*(to_m**2), True
 
+    # Arbitrary (with voids) / composite / derived profiles
+    if any(profile.is_a(t) for t in _OUTLINE_PROFILES):
+        A = profile_area(profile)
+        if A: return A*(to_m**2), True
+
     return None, False
 
+# ---------- Second moments of area ----------
+def _rect_moments(cx, cy, w, h):
+    """(A, ∫x, ∫y, ∫x², ∫y², ∫xy) of a w × h rectangle centred at (cx, cy)."""
+    A = w*h
+    return np.array([A, A*cx, A*cy, h*w**3/12.0 + A*cx*cx, w*h**3/12.0 + A*cy*cy, A*cx*cy])
+
+def _ring_moments(pts):
+    """Same integrals for a closed polygon (Green's theorem; orientation-independent)."""
+    x, y = pts[:, 0], pts[:, 1]
+    x1, y1 = np.roll(x, -1), np.roll(y, -1)
+    c = x*y1 - x1*y
+    m = np.array([c.sum()/2.0, ((x + x1)*c).sum()/6.0, ((y + y1)*c).sum()/6.0,
+                  ((x*x + x*x1 + x1*x1)*c).sum()/12.0, ((y*y + y*y1 + y1*y1)*c).sum()/12.0,
+                  ((x*y1 + 2*x*y + 2*x1*y1 + x1*y)*c).sum()/24.0])
+    return m if m[0] >= 0 else -m
+
+def _profile_parts(profile):
+    """Area integrals (see _rect_moments) of a profile in its own units; None if unsupported."""
+    f = lambda name: _f(getattr(profile, name, None))
+    if profile.is_a("IfcRectangleProfileDef"):
+        x, y = f("XDim"), f("YDim")
+        if not (x and y): return None
+        t = f("WallThickness")  # IfcRectangleHollowProfileDef
+        inner = _rect_moments(0, 0, x - 2*t, y - 2*t) if t and 2*t < min(x, y) else 0.0
+        return _rect_moments(0, 0, x, y) - inner
+    if profile.is_a("IfcCircleProfileDef"):
+        r = f("Radius")
+        if not r: return None
+        m = np.array([math.pi*r*r, 0, 0, math.pi*r**4/4, math.pi*r**4/4, 0])
+        t = f("WallThickness")  # IfcCircleHollowProfileDef
+        if t and t < r:
+            ri = r - t
+            m -= np.array([math.pi*ri*ri, 0, 0, math.pi*ri**4/4, math.pi*ri**4/4, 0])
+        return m
+    if profile.is_a("IfcEllipseProfileDef"):
+        a, b = f("SemiAxis1"), f("SemiAxis2")
+        return np.array([math.pi*a*b, 0, 0, math.pi*a**3*b/4, math.pi*a*b**3/4, 0]) if a and b else None
+    tf, tw = f("FlangeThickness"), f("WebThickness")
+    if profile.is_a("IfcIShapeProfileDef"):
+        b, h = f("OverallWidth"), f("OverallDepth")
+        if not (b and h and tf and tw): return None
+        return (_rect_moments(0, (h - tf)/2, b, tf) + _rect_moments(0, -(h - tf)/2, b, tf)
+                + _rect_moments(0, 0, tw, h - 2*tf))
+    b, h = f("FlangeWidth"), f("Depth")
+    if not (b and h and tf and tw):
+        b = None
+    if profile.is_a("IfcTShapeProfileDef") and b:
+        return _rect_moments(0, (h - tf)/2, b, tf) + _rect_moments(0, -tf/2, tw, h - tf)
+    if profile.is_a("IfcUShapeProfileDef") and b:
+        return (_rect_moments(-(b - tw)/2, 0, tw, h) + _rect_moments(tw/2, (h - tf)/2, b - tw, tf)
+                + _rect_moments(tw/2, -(h - tf)/2, b - tw, tf))
+    if profile.is_a("IfcZShapeProfileDef") and b:
+        return (_rect_moments(0, 0, tw, h - 2*tf) + _rect_moments((b - tw)/2, (h - tf)/2, b, tf)
+                + _rect_moments(-(b - tw)/2, -(h - tf)/2, b, tf))
+    if profile.is_a("IfcArbitraryClosedProfileDef"):
+        outer = _closed_area(profile.OuterCurve)
+        if outer is None: return None
+        m = _ring_moments(np.asarray(outer[1], dtype=float))
+        for inner in (getattr(profile, "InnerCurves", None) or []):
+            hole = _closed_area(inner)
+            if hole is None: return None
+            m = m - _ring_moments(np.asarray(hole[1], dtype=float))
+        return m
+    return None
+
+def min_second_moment(profile, to_m):
+    """Minor principal second moment of area (m⁴) from the profile parameters; None if unknown."""
+    m = _profile_parts(profile) if profile else None
+    if m is None or m[0] <= 0:
+        return None
+    A, Sx, Sy, Ixx, Iyy, Ixy = m  # Ixx = ∫x², about the centroid below
+    cx, cy = Sx/A, Sy/A
+    ix, iy, ixy = Ixx - A*cx*cx, Iyy - A*cy*cy, Ixy - A*cx*cy
+    I = (ix + iy)/2.0 - math.hypot((ix - iy)/2.0, ixy)
+    return float(I) * to_m**4 if I > 0 else None
+
+_GEOM_SETTINGS = None
+
+def _geom():
+    """The ifcopenshell geometry engine, imported the first time a fallback needs it (None if unavailable)."""
+    global _GEOM, GEOM_OK
+    if GEOM_OK is None:
+        try:
+            import ifcopenshell.geom as geom
+            _GEOM, GEOM_OK = geom, True
+        except Exception:
+            GEOM_OK = False
+    return _GEOM
+
+def _geom_settings():
+    """One shared geometry settings object instead of a new one per element."""
+    global _GEOM_SETTINGS
+    if _GEOM_SETTINGS is None:
+        _GEOM_SETTINGS = _geom().settings()
+    return _GEOM_SETTINGS
+
+def _xy_extent(verts):
+    """(dx, dy) of a flat vertex buffer [x0, y0, z0, x1, ...] using NumPy min/max."""
+    v = np.asarray(verts, dtype=float).reshape(-1, 3)
+    if not len(v): return None
+    ext = v[:, :2].max(axis=0) - v[:, :2].min(axis=0)
+    return float(ext[0]), float(ext[1])
+
 def width_height_from_xy_bbox(el):
     """Fallback width/height from XY bounding box (meters)."""
-    if not GEOM_OK: return None
+    geom = _geom()
+    if geom is None: return None
     try:
-        s = geom.create_shape(geom.settings(), el)
-        v = s.geometry.verts  # meters
-        xs, ys = v[0::3], v[1::3]
-        if not xs or not ys: return None
-        return (max(xs)-min(xs)), (max(ys)-min(ys))
+        s = geom.create_shape(_geom_settings(), el)
+        return _xy_extent(s.geometry.verts)  # meters
     except Exception:
         return None
 
+def xy_bbox_batch(model, elements, threads=None):
+    """
+    Tessellate all `elements` in one geometry-iterator run (multi-core).
+    Returns {GlobalId: (w_m, h_m) or None}; every element is tessellated at most once.
+    """
+    out = {}
+    if not elements:
+        return out
+    geom = _geom()
+    if geom is None:
+        return out
+    try:
+        it = geom.iterator(_geom_settings(), model, threads or GEOM_THREADS, include=list(elements))
+        if it.initialize():
+            while True:
+                sh = it.get()
+                out[sh.guid] = _xy_extent(sh.geometry.verts)
+                if not it.next():
+                    break
+    except Exception:
+        pass
+    # Elements the iterator skipped get one individual attempt
+    for el in elements:
+        if el.GlobalId not in out:
+            out[el.GlobalId] = width_height_from_xy_bbox(el)
+    return out
+
 def area_from_xy_bbox(w_m, h_m):
     """Approximate area from bbox (m^2)."""
     if w_m is None or h_m is None: return None
     return w_m * h_m
 
+# ---------- Base quantities ----------
+QTO_COLUMN = "Qto_ColumnBaseQuantities"
+QTO_AREA_TOL = 0.05  # relative difference between Qto and profile area reported as a disagreement
+_QTO_UNIT = {"IfcQuantityLength": "LENGTHUNIT", "IfcQuantityArea": "AREAUNIT", "IfcQuantityVolume": "VOLUMEUNIT"}
+
+def property_definitions(defn):
+    """IfcPropertySetDefinitionSet (IFC4) or a single definition -> list of definitions."""
+    return list(defn) if isinstance(defn, (list, tuple)) else [defn]
+
+def quantity_scaler(model):
+    """
+    scale(q) -> factor from an IfcPhysicalSimpleQuantity's value to SI (m, m², m³): its own Unit,
+    else the project unit of its kind (looked up once per kind); 1.0 for counts, weights, times.
+    """
+    scales = {}
+
+    def scale(q):
+        if getattr(q, "Unit", None) is not None:
+            return _named_unit_scale(q.Unit) or 1.0
+        kind = _QTO_UNIT.get(q.is_a())
+        if kind not in scales:
+            scales[kind] = unit_scale(model, kind) if kind else 1.0
+        return scales[kind]
+    return scale
+
+def quantity_index(model, qset=QTO_COLUMN):
+    """
+    {element id: {quantity name: value}} from every IfcElementQuantity named `qset`, in one pass
+    over IfcRelDefinesByProperties. Values are in SI (see quantity_scaler); shared quantity sets
+    are converted once.
+    """
+    scale = quantity_scaler(model)
+    memo, out = {}, {}
+    for rel in model.by_type("IfcRelDefinesByProperties"):
+        for d in property_definitions(rel.RelatingPropertyDefinition):
+            if not d.is_a("IfcElementQuantity") or d.Name != qset:
+                continue
+            vals = memo.get(d.id())
+            if vals is None:
+                vals = memo[d.id()] = {
+                    q.Name: float(q[3]) * scale(q) for q in (d.Quantities or [])
+                    if q.is_a("IfcPhysicalSimpleQuantity") and isinstance(q[3], (int, float))
+                }
+            for o in rel.RelatedObjects:
+                out.setdefault(o.id(), {}).update(vals)
+    return out
+
 # ---------- Capacity ----------
-def capacity_kN(fc_N_per_mm2, A_m2):
+def capacity_kN(fc_N_per_mm2, A_m2, gamma=None):
     """Nrd = fc * A / gamma_mo; fc in N/mm^2, A in m^2; returns Nrd in kN."""
     if fc_N_per_mm2 is None or A_m2 is None:
         return None
     A_mm2 = A_m2 * 1e6
-    Nrd_N = fc_N_per_mm2 * A_mm2 / gamma_mo
+    Nrd_N = fc_N_per_mm2 * A_mm2 / (gamma_mo if gamma is None else gamma)
     return Nrd_N / 1000.0  # kN
 
-# ---------- Main: generate text report ----------
-def main():
-    model = ifcopenshell.open(MODEL_PATH)
-    to_m = length_unit_scale_to_m(model)
+# Flexural buckling: χ from the EN 1993-1-1 §6.3.1.2 curve form, with per-material imperfection
+# α and plateau λ̄0 (EN 1995-1-1 §6.3.2 has the same form with βc = 0.2, λrel,0 = 0.3).
+BUCKLING_ALPHA = {"Steel": 0.49, "Wood": 0.2}  # others: 0.49 (curve c)
+BUCKLING_LAMBDA0 = {"Wood": 0.3}               # others: 0.2
+E_MODULUS = {"Steel": 210000.0, "Wood": 11000.0}  # N/mm²; others: Ecm(fc) of EN 1992-1-1 Table 3.1
 
-    ok_cnt = 0
-    nok_cnt = 0
-    worst = {"util": -1.0, "gid": None, "Nrd": None, "w": None, "h": None}
-
-    with open("Capacity.control.report.txt", "w", encoding="utf-8") as f, redirect_stdout(f):
-        print("CAPACITY CONTROL REPORT (IfcColumn, storey match: '{}')".format(STOREY_MATCH))
-        print(f"Ned = {Ned:.2f} kN | gamma_mo = {gamma_mo:.2f} | fc_default = {fc_default:.1f} N/mm²")
-        print(f"Model: {MODEL_PATH}")
-        print("-"*80)
-
-        for col in model.by_type("IfcColumn"):
-            st = element_storey(col)
-            if not st or not is_storey_match(st):
-                continue  # only storey "-1"
-            storey_name = getattr(st, "LongName", None) or getattr(st, "Name", "<unknown storey>")
-
-            # Material + fc (with structured-first strategy)
-            names, mcls, fc, fc_src = get_material_info_with_fc(col)
-            name_txt = ", ".join(names[:2]) if names else "<unknown>"
-
-            # Dimensions / area
-            prof = get_material_profiledef(col)
-            wh_m = width_height_from_profile(prof, to_m) if prof else None
-            if not wh_m:
-                prof2 = get_extruded_profiledef(col)
-                wh_m = width_height_from_profile(prof2, to_m) if prof2 else None
-
-            used_bbox = False
-            if not wh_m:
-                wh_m = width_height_from_xy_bbox(col)
-                used_bbox = wh_m is not None
-
-            if wh_m and (wh_m[0] > A_SANITY_EDGE_M or wh_m[1] > A_SANITY_EDGE_M):
-                bb = width_height_from_xy_bbox(col)
-                if bb:
-                    wh_m = bb
-                    used_bbox = True
-
-            A_m2, precise = area_from_profile(prof or get_extruded_profiledef(col), to_m)
-            if (A_m2 is None) and wh_m:
-                A_m2 = area_from_xy_bbox(*wh_m)
-                precise = False
-                used_bbox = True or used_bbox
-
-            # Results
-            if wh_m:
-                w_mm, h_mm = wh_m[0]*1000.0, wh_m[1]*1000.0
-                w_mm, h_mm = (w_mm, h_mm) if w_mm >= h_mm else (h_mm, w_mm)
-                dim_txt = f"{w_mm:.0f} × {h_mm:.0f} mm"
-            else:
-                dim_txt = "<unknown>"
-
-            approx = "~" if (A_m2 is not None and (not precise or used_bbox)) else ""
-            A_txt = f"{approx}{A_m2*1e6:.0f} mm²" if A_m2 is not None else "<unknown>"
-
-            Nrd = capacity_kN(fc, A_m2) if A_m2 is not None else None
-            if Nrd is not None:
-                status = "OK" if Nrd >= Ned else "Maybe insufficient"
-                util = (Ned / Nrd) * 100.0 if Nrd > 0 else float("inf")
-                if util > worst["util"]:
-                    worst.update({"util": util, "gid": col.GlobalId, "Nrd": Nrd, "w": w_mm if wh_m else None, "h": h_mm if wh_m else None})
-                if status == "OK":
-                    ok_cnt += 1
-                else:
-                    nok_cnt += 1
-            else:
-                status = "UNKNOWN"
-                util = float("nan")
-
-            # Per-column block
-            print(f"- GlobalId: {col.GlobalId}")
-            print(f"  Storey: {storey_name}")
-            print(f"  Dimensions: {dim_txt} | A = {A_txt}")
-            print(f"  Material: {mcls} ({name_txt}) | fc used = {fc:.1f} N/mm² (source: {fc_src})")
-            if Nrd is not None:
-                print(f"  Nrd = {Nrd:.1f} kN  vs  Ned = {Ned:.1f} kN  → {status} (utilization = {util:.2f}%)")
+def e_modulus(mcls, fc):
+    """
+    Elastic modulus (N/mm²) per column: by material class, else Ecm = 22·((fc + 8)/10)^0.3 GPa.
+    fc holds one value per column, or one row of values per column (e.g. a sweep over fc).
+    """
+    fc = np.asarray(fc, dtype=float)
+    E = np.array([E_MODULUS.get(m, np.nan) for m in mcls], dtype=float).reshape((-1,) + (1,) * (fc.ndim - 1))
+    return np.where(np.isnan(E), 22000.0 * ((fc + 8.0) / 10.0) ** 0.3, E)
+
+def buckling_reduction(A_m2, I_m4, L0_m, fc, E, alpha, lambda0):
+    """
+    (χ, λ̄) for arrays of columns: Ncr = π²EI/L0², λ̄ = √(A·fc/Ncr), χ ≤ 1.
+    NaN where the length or second moment is unknown.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        Ncr = math.pi**2 * E * 1e6 * I_m4 / L0_m**2        # N
+        lam = np.sqrt(fc * 1e6 * A_m2 / Ncr)
+        phi = 0.5 * (1.0 + alpha * (lam - lambda0) + lam**2)
+        chi = np.minimum(1.0, 1.0 / (phi + np.sqrt(phi**2 - lam**2)))
+        chi = np.where(lam <= lambda0, 1.0, chi)
+    return np.where(np.isnan(lam), np.nan, chi), lam
+
+# ---------- Result records ----------
+class ColumnExtract(NamedTuple):
+    """Everything read from the model for one column (independent of Ned / gamma_mo / fc_default)."""
+    gid: str
+    storey: str
+    storey_elev: Optional[float]
+    w_mm: Optional[float]
+    h_mm: Optional[float]
+    A_m2: Optional[float]
+    approx: bool
+    names: Tuple[str, ...]
+    mcls: str
+    fc: Optional[float]  # None -> fc_default at check time
+    fc_src: Optional[str]
+    area_src: Optional[str] = None   # "qto" / "profile" / "bbox"
+    A_alt_m2: Optional[float] = None  # profile area where it disagrees with the Qto area (see QTO_AREA_TOL)
+    trib_m2: Optional[float] = None  # slab area carried (see tributary_areas); None = no slab found
+    stack_n: int = 1                 # columns in the stack down to this one, itself included (see column_stacks)
+    stack_trib_n: int = 0            # ... of which carry slab area
+    stack_trib_m2: float = 0.0       # slab area carried by the whole stack
+    L_m: Optional[float] = None      # column length (extrusion depth, else Qto Length)
+    I_m4: Optional[float] = None     # minor principal second moment of area
+    storey_names: Optional[str] = None  # storey Name + LongName, what the storey filter matches
+
+class ColumnResult(NamedTuple):
+    """One evaluated column; what every report writer consumes."""
+    gid: str
+    storey: str
+    storey_elev: Optional[float]
+    w_mm: Optional[float]
+    h_mm: Optional[float]
+    A_m2: Optional[float]
+    approx: bool
+    names: Tuple[str, ...]
+    mcls: str
+    fc: float
+    fc_src: Optional[str]
+    Ned: float
+    Nrd: Optional[float]
+    status: str
+    util: float                      # governing utilization (axial or buckling)
+    area_src: Optional[str] = None
+    A_alt_m2: Optional[float] = None
+    trib_m2: Optional[float] = None
+    stack_n: int = 1
+    util_axial: Optional[float] = None
+    Nb_rd: Optional[float] = None    # buckling resistance χ·Nrd
+    util_b: Optional[float] = None
+    chi: Optional[float] = None
+    lam: Optional[float] = None      # non-dimensional slenderness λ̄
+    L0_m: Optional[float] = None
+    storey_names: Optional[str] = None
+
+# ---------- Evaluation (all columns, one traversal) ----------
+def _storey_key(storey):
+    """(display name, elevation) used to group results per storey."""
+    name = getattr(storey, "LongName", None) or getattr(storey, "Name", "<unknown storey>")
+    return name, _f(getattr(storey, "Elevation", None))
+
+def _extract_chunk(model, columns, to_m, index, mat_cache, perf, quantities):
+    """Extract one chunk of columns (profile pass, then one batched geometry pass)."""
+    # Pass 1: profile-based dimensions; collect the columns that need a bounding box
+    t0 = time.perf_counter()
+    dims, need_bbox = {}, []
+    for col in columns:
+        A_qto = quantities.get(col.id(), {}).get("CrossSectionArea")
+        A_qto = A_qto if A_qto and A_qto > 0 else None
+        prof = get_material_profiledef(col)
+        wh_m = width_height_from_profile(prof, to_m) if prof else None
+        prof2 = None
+        if wh_m:
+            count(perf, "profile.material_profile")
+        else:
+            prof2 = get_extruded_profiledef(col)
+            wh_m = width_height_from_profile(prof2, to_m) if prof2 else None
+            count(perf, "profile.extruded" if wh_m else "profile.none")
+        area_prof = prof or prof2 or get_extruded_profiledef(col)
+        L_m = get_extrusion_depth(col, to_m) or quantities.get(col.id(), {}).get("Length")
+        dims[col.id()] = (wh_m, area_prof, A_qto, L_m)
+        if not wh_m or wh_m[0] > A_SANITY_EDGE_M or wh_m[1] > A_SANITY_EDGE_M:
+            if A_qto is None:
+                need_bbox.append(col)
             else:
-                print(f"  Nrd = <unknown> (missing area/dimensions)")
-            print("")
+                count(perf, "geometry.skipped_qto")  # the area is known; dimensions stay as found
+    add_time(perf, "profile", time.perf_counter() - t0)
+
+    # Pass 2: tessellate all fallback columns together
+    with stage(perf, "geometry_fallback"):
+        bboxes = xy_bbox_batch(model, need_bbox)
+    count(perf, "geometry.tessellated", len(need_bbox))
+    count(perf, "geometry.failed", sum(1 for v in bboxes.values() if v is None))
+
+    for col in columns:
+        t0 = time.perf_counter()
+        st = index["storey_of"].get(col.id())
+        storey_name, storey_elev = _storey_key(st) if st else ("<no storey>", None)
+        storey_names = storey_match_text(st) if st else storey_name
+        t1 = time.perf_counter()
+        add_time(perf, "storey", t1 - t0)
+
+        # Material + fc (with structured-first strategy); the default is applied at check time
+        names, mcls, fc, fc_src = get_material_info_with_fc(col, mat_cache)
+        add_time(perf, "material", time.perf_counter() - t1)
+        count(perf, f"fc.{fc_src}")
+        if fc_src == "default":
+            fc = None
+
+        # Dimensions / area
+        wh_m, area_prof, A_qto, L_m = dims[col.id()]
+
+        used_bbox = False
+        if not wh_m:
+            wh_m = bboxes.get(col.GlobalId)
+            used_bbox = wh_m is not None
+
+        if wh_m and (wh_m[0] > A_SANITY_EDGE_M or wh_m[1] > A_SANITY_EDGE_M):
+            count(perf, "sanity_edge.triggered")  # served from the batched bboxes, not re-tessellated
+            bb = bboxes.get(col.GlobalId)
+            if bb:
+                wh_m = bb
+                used_bbox = True
+
+        A_m2, precise = area_from_profile(area_prof, to_m)
+        area_src = "profile" if A_m2 is not None else None
+        A_alt = None
+        if A_qto is not None:
+            # base quantity first; a precise profile area cross-checks it
+            if A_m2 is not None and precise and abs(A_qto - A_m2) > QTO_AREA_TOL * max(A_qto, A_m2):
+                A_alt = A_m2
+                count(perf, "area.qto_mismatch")
+            A_m2, precise, used_bbox, area_src = A_qto, True, False, "qto"
+        elif (A_m2 is None) and wh_m:
+            A_m2 = area_from_xy_bbox(*wh_m)
+            precise = False
+            used_bbox = True or used_bbox
+        if used_bbox and A_m2 is not None:
+            area_src = "bbox"
+        I_m4 = min_second_moment(area_prof, to_m) if area_src != "bbox" else None
+        if I_m4 is None and wh_m:
+            I_m4 = max(wh_m) * min(wh_m)**3 / 12.0  # solid rectangle of the found extent
+        count(perf, "area.none" if A_m2 is None else f"area.{area_src}")
+
+        w_mm = h_mm = None
+        if wh_m:
+            w_mm, h_mm = wh_m[0]*1000.0, wh_m[1]*1000.0
+            w_mm, h_mm = (w_mm, h_mm) if w_mm >= h_mm else (h_mm, w_mm)
+
+        yield ColumnExtract(
+            gid=col.GlobalId, storey=storey_name, storey_elev=storey_elev,
+            w_mm=w_mm, h_mm=h_mm, A_m2=A_m2,
+            approx=A_m2 is not None and (not precise or used_bbox),
+            names=tuple(names), mcls=mcls, fc=fc, fc_src=fc_src, area_src=area_src, A_alt_m2=A_alt,
+            L_m=L_m, I_m4=I_m4, storey_names=storey_names,
+        )
+
+def iter_column_extracts(model, columns, to_m, index, mat_cache=None, chunk=None, perf=None):
+    """
+    Yield one ColumnExtract per column (same order), extracting `chunk` columns at a time
+    so memory stays bounded on huge models. Pass `perf` (new_perf()) to collect timings/counters.
+    """
+    mat_cache = new_material_cache() if mat_cache is None else mat_cache
+    perf = new_perf() if perf is None else perf
+    chunk = chunk or EVAL_CHUNK
+    with stage(perf, "quantities"):
+        quantities = quantity_index(model)
+    count(perf, "qto.columns", len(quantities))
+    batch = []
+    for col in columns:
+        batch.append(col)
+        if len(batch) >= chunk:
+            yield from _extract_chunk(model, batch, to_m, index, mat_cache, perf, quantities)
+            batch = []
+    if batch:
+        yield from _extract_chunk(model, batch, to_m, index, mat_cache, perf, quantities)
+
+def _floats(vals):
+    """Float array of optional values (None -> NaN)."""
+    return np.array([np.nan if v is None else v for v in vals], dtype=float)
+
+def _load_terms(xs, cfg):
+    """
+    (n, fixed, per_Ned) per column, so that the design load is Ned_kN = fixed + per_Ned · Ned:
+    every column in the stack brings slab_load × its slab area, or Ned where it carries no slab.
+    """
+    if cfg.stack_loads:
+        n, trib_n, trib = (_floats(v) for v in zip(*((x.stack_n, x.stack_trib_n, x.stack_trib_m2) for x in xs)))
+    else:
+        n = np.ones(len(xs))
+        trib_n = np.array([x.trib_m2 is not None for x in xs], dtype=float)
+        trib = np.nan_to_num(_floats(x.trib_m2 for x in xs))
+    if cfg.slab_load is None:
+        return n, np.zeros(len(xs)), n
+    return n, cfg.slab_load * trib, n - trib_n
+
+def _buckling_terms(xs, A, fc, cfg):
+    """(χ, λ̄, L0) per column for fc (per column, or per column × case; see buckling_reduction)."""
+    col = lambda v: v.reshape((-1,) + (1,) * (np.ndim(fc) - 1))
+    mcls = [x.mcls for x in xs]
+    L0 = cfg.buckling_k * _floats(x.L_m for x in xs)
+    chi, lam = buckling_reduction(col(A), col(_floats(x.I_m4 for x in xs)), col(L0), fc, e_modulus(mcls, fc),
+                                  col(np.array([BUCKLING_ALPHA.get(m, 0.49) for m in mcls])),
+                                  col(np.array([BUCKLING_LAMBDA0.get(m, 0.2) for m in mcls])))
+    return chi, lam, L0
+
+def check_columns(extracts, cfg=None):
+    """
+    Capacity checks of a batch of extracted columns as NumPy array operations: the axial
+    resistance Nrd = fc·A/gamma_mo and, with cfg.buckling, the buckling resistance χ·Nrd.
+    """
+    cfg = cfg or default_config()
+    xs = list(extracts)
+    if not xs:
+        return []
+    fc = np.array([x.fc if x.fc is not None else cfg.fc_default for x in xs], dtype=float)
+    A = _floats(x.A_m2 for x in xs)
+    Nrd = fc * (A * 1e6) / cfg.gamma_mo / 1000.0  # kN, as capacity_kN()
+    n, fixed, per_Ned = _load_terms(xs, cfg)
+    Ned_kN = fixed + per_Ned * cfg.Ned
+    with np.errstate(divide="ignore", invalid="ignore"):
+        util_a = np.where(Nrd > 0, Ned_kN / Nrd * 100.0, np.inf)
+    if cfg.buckling:
+        chi, lam, L0 = _buckling_terms(xs, A, fc, cfg)
+    else:
+        L0 = chi = lam = np.full(len(xs), np.nan)
+    Nb = chi * Nrd
+    with np.errstate(divide="ignore", invalid="ignore"):
+        util_b = np.where(Nb > 0, Ned_kN / Nb * 100.0, np.inf)
+    opt = lambda v: None if np.isnan(v) else float(v)
+
+    out = []
+    for i, x in enumerate(xs):
+        if np.isnan(Nrd[i]):
+            status, util, ua, nb = "UNKNOWN", float("nan"), None, None
+        else:
+            ua = float(util_a[i])
+            nb = opt(Nb[i])
+            util = max(ua, float(util_b[i])) if nb is not None else ua
+            status = "OK" if Nrd[i] >= Ned_kN[i] and (nb is None or nb >= Ned_kN[i]) else "Maybe insufficient"
+        out.append(ColumnResult(
+            gid=x.gid, storey=x.storey, storey_elev=x.storey_elev,
+            w_mm=x.w_mm, h_mm=x.h_mm, A_m2=x.A_m2, approx=x.approx,
+            names=x.names, mcls=x.mcls, fc=float(fc[i]), fc_src=x.fc_src,
+            Ned=float(Ned_kN[i]), Nrd=opt(Nrd[i]), status=status, util=util,
+            area_src=x.area_src, A_alt_m2=x.A_alt_m2, trib_m2=x.trib_m2, stack_n=int(n[i]),
+            util_axial=ua, Nb_rd=nb, util_b=float(util_b[i]) if nb is not None else None,
+            chi=opt(chi[i]) if nb is not None else None, lam=opt(lam[i]) if nb is not None else None,
+            L0_m=opt(L0[i]) if nb is not None else None, storey_names=x.storey_names,
+        ))
+    return out
+
+def check_column(x, cfg=None):
+    """Capacity check of one extracted column with the config's Ned / gamma_mo / fc_default."""
+    return check_columns([x], cfg)[0]
+
+def iter_checks(extracts, cfg=None, chunk=None, perf=None):
+    """
+    Yield ColumnResults, checking `chunk` extracts at a time (see check_columns).
+    With `perf`, only the checks are timed ("capacity"); pulling the extracts is not.
+    """
+    chunk = chunk or EVAL_CHUNK
+    def run(batch):
+        t0 = time.perf_counter()
+        out = check_columns(batch, cfg)
+        if perf is not None:
+            add_time(perf, "capacity", time.perf_counter() - t0)
+        return out
+    batch = []
+    for x in extracts:
+        batch.append(x)
+        if len(batch) >= chunk:
+            yield from run(batch)
+            batch = []
+    if batch:
+        yield from run(batch)
+
+def iter_column_results(model, columns, to_m, index, mat_cache=None, chunk=None, cfg=None):
+    """Yield one ColumnResult per column (extraction + capacity check)."""
+    yield from iter_checks(iter_column_extracts(model, columns, to_m, index, mat_cache, chunk), cfg, chunk)
+
+def evaluate_columns(model, columns, to_m, index, mat_cache=None, cfg=None):
+    """List version of iter_column_results()."""
+    return list(iter_column_results(model, columns, to_m, index, mat_cache, cfg=cfg))
+
+def iter_model_columns(index):
+    """Every storey-contained (or elevation-placed) IfcColumn in the index, in model order."""
+    return sorted((el for els in index["elements"].values() for el in els if el.is_a("IfcColumn")),
+                  key=lambda e: e.id())
+
+# ---------- Placements ----------
+# IfcLocalPlacement chains are resolved for many elements at once: the unresolved ancestors are
+# collected and ordered by depth, their local transforms built as one (n, 4, 4) array, and each
+# depth level composed with its parents in a single batched matmul. `memo` ({placement id: 4×4})
+# keeps the absolute transforms, so shared parents (site, building, storeys) are done once.
+
+def _axis2_batch(aps):
+    """(n, 4, 4) transforms of IfcAxis2Placement2D/3D (model units); identity for None."""
+    n = len(aps)
+    loc = np.zeros((n, 3))
+    z = np.tile([0.0, 0.0, 1.0], (n, 1))
+    x = np.tile([1.0, 0.0, 0.0], (n, 1))
+    for i, ap in enumerate(aps):  # positional attributes: much cheaper than named access
+        if ap is None:
+            continue
+        if ap[0] is not None:  # Location
+            c = ap[0][0][:3]
+            loc[i, :len(c)] = c
+        if len(ap) == 3:       # IfcAxis2Placement3D: Location, Axis, RefDirection
+            if ap[1] is not None:
+                z[i] = ap[1][0][:3]
+            if ap[2] is not None:
+                x[i] = ap[2][0][:3]
+        elif ap[1] is not None:  # IfcAxis2Placement2D: Location, RefDirection
+            x[i, :2] = ap[1][0][:2]
+    nz = np.linalg.norm(z, axis=1, keepdims=True)
+    z = z / np.where(nz > 0, nz, 1.0)
+    x = x - (x * z).sum(axis=1, keepdims=True) * z
+    nx = np.linalg.norm(x, axis=1)
+    bad = nx <= 1e-12  # RefDirection along Axis: any perpendicular will do
+    x[bad] = np.where(np.abs(z[bad, :1]) < 0.9, [1.0, 0.0, 0.0], [0.0, 1.0, 0.0])
+    x[bad] -= (x[bad] * z[bad]).sum(axis=1, keepdims=True) * z[bad]
+    x = x / np.linalg.norm(x, axis=1, keepdims=True)
+    m = np.tile(np.eye(4), (n, 1, 1))
+    m[:, :3, 0], m[:, :3, 1], m[:, :3, 2], m[:, :3, 3] = x, np.cross(z, x), z, loc
+    return m
+
+def _axis2_matrix(ap):
+    """4×4 transform of an IfcAxis2Placement2D/3D (model units); identity for None."""
+    return _axis2_batch([ap])[0]
+
+def _parent_placement(p):
+    return p[0] if p.is_a() == "IfcLocalPlacement" else None  # PlacementRelTo; IfcGridPlacement: not resolved
+
+def placement_matrices(placements, memo=None):
+    """(n, 4, 4) absolute transforms of IfcObjectPlacements (model units; identity for None)."""
+    memo = {} if memo is None else memo
+    depth, parent, levels = {}, {}, {}
+    for p in placements:
+        chain, seen, cur = [], set(), p
+        while cur is not None and cur.id() not in memo and cur.id() not in depth:
+            if cur.id() in seen:  # cyclic placement: treat as root
+                cur = None
+                break
+            seen.add(cur.id())
+            chain.append(cur)
+            cur = _parent_placement(cur)
+        d = depth[cur.id()] + 1 if cur is not None and cur.id() in depth else 0
+        for node in reversed(chain):
+            depth[node.id()] = d
+            parent[node.id()] = cur
+            levels.setdefault(d, []).append(node)
+            cur, d = node, d + 1
+    for d in sorted(levels):
+        nodes = levels[d]
+        local = _axis2_batch([n[1] if n.is_a() == "IfcLocalPlacement" else None for n in nodes])
+        up = np.array([np.eye(4) if parent[n.id()] is None else memo[parent[n.id()].id()] for n in nodes])
+        for n, m in zip(nodes, up @ local):
+            memo[n.id()] = m
+    eye = np.eye(4)
+    return np.array([eye if p is None else memo[p.id()] for p in placements]).reshape(-1, 4, 4)
+
+def placement_matrix(placement, memo=None):
+    """Absolute 4×4 transform of an IfcObjectPlacement (model units); `memo` shares parents."""
+    return placement_matrices([placement], memo)[0]
+
+def absolute_positions(elements, to_m, memo=None):
+    """(n, 3) array of element placement origins in metres."""
+    return placement_matrices([el.ObjectPlacement for el in elements], memo)[:, :3, 3] * to_m
+
+# ---------- Spatial grid (XY hash) ----------
+def grid_index(xy, cell):
+    """Hash XY points into square cells of size `cell`: {"cell", "xy", "cells": {(i, j): indices}}."""
+    xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+    cells = {}
+    for i, key in enumerate(map(tuple, np.floor(xy / cell).astype(np.int64).tolist())):
+        cells.setdefault(key, []).append(i)
+    return {"cell": cell, "xy": xy, "cells": {k: np.asarray(v) for k, v in cells.items()}}
+
+def _ring_candidates(grid, ci, cj, r):
+    cells = grid["cells"]
+    found = [cells[k] for k in ((ci + di, cj + dj) for di in range(-r, r + 1) for dj in range(-r, r + 1)) if k in cells]
+    return np.concatenate(found) if found else None
+
+def grid_nearest(grid, pts):
+    """Index (into grid["xy"]) of the nearest indexed point for each query point."""
+    pts = np.asarray(pts, dtype=float).reshape(-1, 2)
+    out = np.empty(len(pts), dtype=np.int64)
+    if not len(pts):
+        return out
+    keys = np.floor(pts / grid["cell"]).astype(np.int64)
+    uniq, inv = np.unique(keys, axis=0, return_inverse=True)
+    inv = inv.reshape(-1)
+    order = np.argsort(inv, kind="stable")
+    bounds = np.searchsorted(inv[order], np.arange(len(uniq) + 1))
+    span = np.ptp(np.array(list(grid["cells"])), axis=0).max() + np.abs(uniq).max() + 2
+    for u, (ci, cj) in enumerate(uniq.tolist()):
+        q = order[bounds[u]:bounds[u + 1]]
+        r = 0
+        while _ring_candidates(grid, ci, cj, r) is None and r <= span:
+            r += 1
+        # anything closer than the first hit lies within ceil((r + 1)·√2) rings
+        cand = _ring_candidates(grid, ci, cj, int(math.ceil((r + 1) * math.sqrt(2))))
+        d = ((pts[q, None, :] - grid["xy"][None, cand, :]) ** 2).sum(axis=2)
+        out[q] = cand[d.argmin(axis=1)]
+    return out
+
+# ---------- Load takedown (tributary slab areas) ----------
+LOAD_GRID_M = 0.25   # sampling step over slab footprints for the tributary partition
+SLAB_LEVEL_TOL_M = 0.1
+
+def _solid_item(item):
+    """The extrusion behind boolean clippings (openings / cuts are ignored)."""
+    while item is not None and item.is_a("IfcBooleanResult"):
+        item = item.FirstOperand
+    return item if item is not None and item.is_a("IfcExtrudedAreaSolid") else None
+
+def slab_footprints(model, to_m, memo=None):
+    """[(top z, outline XY, [void XY, ...])] in metres for every IfcSlab modelled as a vertical extrusion."""
+    memo = {} if memo is None else memo
+    out = []
+    for slab in model.by_type("IfcSlab"):
+        rep = slab.Representation
+        if not rep:
+            continue
+        place = placement_matrix(slab.ObjectPlacement, memo)
+        for cr in (rep.Representations or []):
+            for it in (cr.Items or []):
+                solid = _solid_item(it)
+                if solid is None:
+                    continue
+                pts = profile_points(solid.SweptArea)
+                if pts is None:
+                    continue
+                m = place @ _axis2_matrix(solid.Position)
+                d = m[:3, :3] @ np.asarray(solid.ExtrudedDirection.DirectionRatios, dtype=float)
+                d = d / (np.linalg.norm(d) or 1.0)
+                if abs(d[2]) < 0.9:
+                    continue  # not a horizontal slab
+                def world(p2):
+                    return (np.column_stack([p2, np.zeros(len(p2)), np.ones(len(p2))]) @ m.T)[:, :3] * to_m
+                outline = world(pts)
+                z0 = float(outline[:, 2].mean())
+                top = max(z0, z0 + float(solid.Depth) * d[2] * to_m)
+                voids = [world(h[1])[:, :2] for h in (_closed_area(c) for c in (getattr(solid.SweptArea, "InnerCurves", None) or [])) if h]
+                out.append((top, outline[:, :2], voids))
+    return out
+
+def _in_polygon(pts, poly):
+    """Even-odd point-in-polygon test of many points against one polygon (NumPy)."""
+    x, y = pts[:, 0], pts[:, 1]
+    inside = np.zeros(len(pts), dtype=bool)
+    xj, yj = poly[-1]
+    for xi, yi in poly:
+        if yi != yj:
+            inside ^= ((yi > y) != (yj > y)) & (x < (xj - xi) * (y - yi) / (yj - yi) + xi)
+        xj, yj = xi, yi
+    return inside
+
+def _storey_z(storey, to_m, memo):
+    if storey.ObjectPlacement is not None:
+        return float(placement_matrix(storey.ObjectPlacement, memo)[2, 3]) * to_m
+    return (_f(getattr(storey, "Elevation", None)) or 0.0) * to_m
+
+def tributary_areas(model, columns, index, to_m, step=None):
+    """
+    {GlobalId: m²} of slab area each column carries. Columns on a storey carry the slabs whose
+    top lies above that storey, up to and including the next storey level; every slab point goes
+    to its nearest column on that storey (Voronoi partition, sampled every `step` metres and
+    looked up in a per-storey XY grid, so the cost stays near-linear in columns and slabs).
+    """
+    step = step or LOAD_GRID_M
+    memo = {}
+    slabs = slab_footprints(model, to_m, memo)
+    if not slabs or not columns:
+        return {}
+    levels = sorted(_storey_z(st, to_m, memo) for st in index["storeys"].values())
+    tops = np.array([t for t, _, _ in slabs])
+    out = {}
+    for z, cols in _columns_by_level(columns, index, to_m, memo):
+        above = [lv for lv in levels if lv > z + SLAB_LEVEL_TOL_M]
+        z_hi = above[0] + SLAB_LEVEL_TOL_M if above else float("inf")
+        carried = np.flatnonzero((tops > z + SLAB_LEVEL_TOL_M) & (tops <= z_hi))
+        if not len(carried):
+            continue
+        xy = absolute_positions(cols, to_m, memo)[:, :2]
+        ext = np.ptp(xy, axis=0)
+        grid = grid_index(xy, max(math.sqrt(max(ext[0] * ext[1], 1.0) / len(cols)), 4 * step))
+        area = np.zeros(len(cols))
+        for k in carried:
+            _, poly, voids = slabs[k]
+            lo, hi = poly.min(axis=0), poly.max(axis=0)
+            gx = np.arange(lo[0] + step / 2, hi[0], step)
+            gy = np.arange(lo[1] + step / 2, hi[1], step)
+            pts = np.column_stack([np.repeat(gx, len(gy)), np.tile(gy, len(gx))])
+            keep = _in_polygon(pts, poly)
+            for v in voids:
+                keep &= ~_in_polygon(pts, v)
+            pts = pts[keep]
+            area += np.bincount(grid_nearest(grid, pts), minlength=len(cols)) * step * step
+        out.update((c.GlobalId, float(a)) for c, a in zip(cols, area))
+    return out
+
+# ---------- Column stacks ----------
+STACK_TOL_M = 0.3  # max XY offset between a column and the one it stands on
+
+def _columns_by_level(columns, index, to_m, memo):
+    """[(storey z, [columns])] bottom-up, for storey-contained columns."""
+    by_storey = {}
+    for col in columns:
+        st = index["storey_of"].get(col.id())
+        if st is not None:
+            by_storey.setdefault(st.id(), (st, []))[1].append(col)
+    return sorted(((_storey_z(st, to_m, memo), cols) for st, cols in by_storey.values()), key=lambda t: t[0])
+
+def column_stacks(columns, index, to_m, tol=None, memo=None):
+    """
+    {GlobalId: GlobalId of the column directly below}: each column is linked to the nearest
+    column of the next lower storey (by elevation) whose XY position is within `tol` metres.
+    Positions are resolved in one pass and looked up in a per-storey XY grid.
+    """
+    tol = STACK_TOL_M if tol is None else tol
+    memo = {} if memo is None else memo
+    below, lower = {}, None
+    for _, cols in _columns_by_level(columns, index, to_m, memo):
+        xy = absolute_positions(cols, to_m, memo)[:, :2]
+        if lower is not None:
+            lower_cols, grid = lower
+            near = grid_nearest(grid, xy)
+            dist = np.hypot(*(xy - grid["xy"][near]).T)
+            below.update((c.GlobalId, lower_cols[j].GlobalId) for c, j, d in zip(cols, near, dist) if d <= tol)
+        ext = np.ptp(xy, axis=0)
+        lower = cols, grid_index(xy, max(math.sqrt(max(ext[0] * ext[1], 1.0) / len(cols)), tol))
+    return below
+
+def load_takedown(model, columns, index, to_m):
+    """
+    {GlobalId: (trib_m2, stack_n, stack_trib_n, stack_trib_m2)}: the column's own tributary
+    slab area plus the totals of its stack, accumulated top-down through column_stacks().
+    """
+    memo = {}
+    areas = tributary_areas(model, columns, index, to_m)
+    below = column_stacks(columns, index, to_m, memo=memo)
+    acc = {gid: [1, 1, a] for gid, a in areas.items()}
+    for _, cols in reversed(_columns_by_level(columns, index, to_m, memo)):
+        for c in cols:
+            own = acc.setdefault(c.GlobalId, [1, 0, 0.0])
+            under = below.get(c.GlobalId)
+            if under is not None:
+                tot = acc.setdefault(under, [1, int(under in areas), areas.get(under, 0.0)])
+                tot[0] += own[0]; tot[1] += own[1]; tot[2] += own[2]
+    return {gid: (areas.get(gid), *tot) for gid, tot in acc.items()}
+
+def with_load_takedown(extracts, takedown):
+    """Set trib_m2 and the stack totals on each extract from load_takedown()."""
+    for x in extracts:
+        t = takedown.get(x.gid)
+        yield x if t is None else x._replace(trib_m2=t[0], stack_n=t[1], stack_trib_n=t[2], stack_trib_m2=t[3])
+
+# ---------- Column inventory (columnar) ----------
+class ColumnInventory(NamedTuple):
+    """One row per column; categorical columns are int codes into the label lists."""
+    gid: list             # GlobalId per row
+    type_code: np.ndarray # -> types
+    storey_code: np.ndarray  # -> storeys
+    mcls_code: np.ndarray # -> materials
+    w_mm: np.ndarray      # larger section edge, NaN = unknown
+    h_mm: np.ndarray      # smaller section edge, NaN = unknown
+    A_m2: np.ndarray      # NaN = unknown
+    types: list
+    storeys: list
+    materials: list
+
+_INVENTORY_FIELDS = {"type": ("type_code", "types"), "storey": ("storey_code", "storeys"),
+                     "material": ("mcls_code", "materials")}
+
+def _type_name(col):
+    for t_rel in (col.IsTypedBy or []):
+        name = getattr(t_rel.RelatingType, "Name", None)
+        if name:
+            return name
+    return getattr(col, "ObjectType", None) or "<no type>"
+
+def _coder(labels):
+    """Label -> int code, assigning codes in first-seen order."""
+    codes = {}
+    def code(label):
+        c = codes.get(label)
+        if c is None:
+            c = codes[label] = len(labels)
+            labels.append(label)
+        return c
+    return code
+
+def column_inventory(model, columns, to_m, index, mat_cache=None, extracts=None):
+    """
+    Walk `columns` once (through iter_column_extracts, or the given `extracts` of the same
+    columns) into a compact ColumnInventory. Rows are appended to typed arrays.
+    """
+    if extracts is None:
+        extracts = iter_column_extracts(model, columns, to_m, index, mat_cache)
+    gids, types, storeys, materials = [], [], [], []
+    type_of, storey_of, mcls_of = _coder(types), _coder(storeys), _coder(materials)
+    tc, sc, mc = array("i"), array("i"), array("i")
+    w, h, a = array("d"), array("d"), array("d")
+    nan = float("nan")
+    for col, x in zip(columns, extracts):
+        gids.append(x.gid)
+        tc.append(type_of(_type_name(col)))
+        sc.append(storey_of(x.storey))
+        mc.append(mcls_of(x.mcls))
+        w.append(nan if x.w_mm is None else x.w_mm)
+        h.append(nan if x.h_mm is None else x.h_mm)
+        a.append(nan if x.A_m2 is None else x.A_m2)
+    return ColumnInventory(
+        gids, np.frombuffer(tc, dtype=np.intc), np.frombuffer(sc, dtype=np.intc),
+        np.frombuffer(mc, dtype=np.intc), np.frombuffer(w), np.frombuffer(h), np.frombuffer(a),
+        types, storeys, materials,
+    )
+
+def _inventory_codes(inv, by):
+    """(codes, labels) for a grouping field; 'dimension' groups by rounded section size."""
+    if by == "dimension":
+        known = ~(np.isnan(inv.w_mm) | np.isnan(inv.h_mm))
+        dims = np.where(known[:, None], np.rint(np.column_stack([inv.h_mm, inv.w_mm])), -1.0)
+        uniq, codes = np.unique(dims, axis=0, return_inverse=True)
+        labels = ["<unknown>" if hh < 0 else f"{hh:.0f}x{ww:.0f}" for hh, ww in uniq]
+        return codes.reshape(-1), labels
+    code_field, label_field = _INVENTORY_FIELDS[by]
+    return getattr(inv, code_field), getattr(inv, label_field)
+
+def inventory_group(inv, by, where=None, area=False):
+    """
+    Rows grouped by 'type', 'storey', 'material' or 'dimension' -> {label: count}
+    (or {label: total known area in m²} with area=True). `where` filters rows by
+    field labels, e.g. {"material": "Concrete"}. Empty groups are left out.
+    """
+    mask = np.ones(len(inv.gid), dtype=bool)
+    for field, label in (where or {}).items():
+        codes, labels = _inventory_codes(inv, field)
+        mask &= codes == (labels.index(label) if label in labels else -1)
+    codes, labels = _inventory_codes(inv, by)
+    n = np.bincount(codes[mask], minlength=len(labels))
+    if area:
+        A = np.nan_to_num(inv.A_m2[mask])
+        vals = np.bincount(codes[mask], weights=A, minlength=len(labels))
+        return {labels[i]: float(vals[i]) for i in np.flatnonzero(n)}
+    return {labels[i]: int(n[i]) for i in np.flatnonzero(n)}
+
+# ---------- Extraction cache (SQLite) ----------
+EXTRACTOR_VERSION = 10  # bump whenever extraction logic changes; old cached rows are then ignored
+
+# columns added to the cache table after its first version (migrated with ALTER TABLE)
+_CACHE_ADDED_COLUMNS = (("trib_m2", "REAL"), ("stack_n", "INTEGER"), ("stack_trib_n", "INTEGER"),
+                        ("stack_trib_m2", "REAL"), ("area_src", "TEXT"), ("A_alt_m2", "REAL"),
+                        ("L_m", "REAL"), ("I_m4", "REAL"), ("storey_names", "TEXT"))
+
+def _open_cache(cache_path):
+    db = sqlite3.connect(cache_path, timeout=60)  # batch workers may share one cache file
+    db.executescript("""
+        CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha256 TEXT);
+        CREATE TABLE IF NOT EXISTS runs (model_hash TEXT, version INTEGER, rules TEXT, PRIMARY KEY (model_hash, version));
+        CREATE TABLE IF NOT EXISTS columns (
+            model_hash TEXT, version INTEGER, seq INTEGER,
+            gid TEXT, storey TEXT, storey_elev REAL, w_mm REAL, h_mm REAL, A_m2 REAL, approx INTEGER,
+            names TEXT, mcls TEXT, fc REAL, fc_src TEXT, trib_m2 REAL,
+            stack_n INTEGER, stack_trib_n INTEGER, stack_trib_m2 REAL, area_src TEXT, A_alt_m2 REAL,
+            L_m REAL, I_m4 REAL, storey_names TEXT,
+            PRIMARY KEY (model_hash, version, seq));
+        CREATE TABLE IF NOT EXISTS fingerprints (
+            model_hash TEXT, version INTEGER, gid TEXT, fp TEXT, PRIMARY KEY (model_hash, version, gid));
+    """)
+    have = {row[1] for row in db.execute("PRAGMA table_info(columns)")}
+    added = [("columns", name, kind) for name, kind in _CACHE_ADDED_COLUMNS if name not in have]
+    if "rules" not in {row[1] for row in db.execute("PRAGMA table_info(runs)")}:
+        added.append(("runs", "rules", "TEXT"))  # NULL never matches: such runs are re-extracted
+    if added:
+        with db:  # cache file from an older version
+            for table, name, kind in added:
+                db.execute(f"ALTER TABLE {table} ADD COLUMN {name} {kind}")
+    return db
+
+def model_file_hash(path, db=None):
+    """SHA-256 of the model file; reuses the stored hash while size and mtime are unchanged."""
+    st = os.stat(path)
+    key = os.path.abspath(path)
+    if db is not None:
+        row = db.execute("SELECT sha256 FROM files WHERE path=? AND size=? AND mtime_ns=?",
+                         (key, st.st_size, st.st_mtime_ns)).fetchone()
+        if row:
+            return row[0]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    digest = h.hexdigest()
+    if db is not None:
+        with db:
+            db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", (key, st.st_size, st.st_mtime_ns, digest))
+    return digest
+
+def _cached_extracts(db, model_hash):
+    """Stream cached rows for a complete run (None if the model/version/material rules aren't cached)."""
+    if not db.execute("SELECT 1 FROM runs WHERE model_hash=? AND version=? AND rules=?",
+                      (model_hash, EXTRACTOR_VERSION, material_rules_digest())).fetchone():
+        return None
+    cur = db.execute(f"SELECT {', '.join(ColumnExtract._fields)} "
+                     "FROM columns WHERE model_hash=? AND version=? ORDER BY seq", (model_hash, EXTRACTOR_VERSION))
+    return (ColumnExtract(*row[:6], bool(row[6]), tuple(json.loads(row[7])), *row[8:]) for row in cur)
+
+def _store_extracts(db, model_hash, extracts):
+    """
+    Pass extracts through while collecting them; once exhausted they are written in one
+    short transaction (keeps the database unlocked for other processes meanwhile).
+    """
+    rows = []
+    for seq, x in enumerate(extracts):
+        rows.append((model_hash, EXTRACTOR_VERSION, seq, *x[:6], int(x.approx),
+                     json.dumps(list(x.names), ensure_ascii=False), *x[8:]))
+        yield x
+    # named columns: the table may carry columns added by a newer version
+    fields = ("model_hash", "version", "seq") + ColumnExtract._fields
+    with db:
+        db.execute("DELETE FROM columns WHERE model_hash=? AND version=?", (model_hash, EXTRACTOR_VERSION))
+        db.executemany(f"INSERT INTO columns ({', '.join(fields)}) VALUES ({', '.join('?' * len(fields))})", rows)
+        db.execute("INSERT OR REPLACE INTO runs (model_hash, version, rules) VALUES (?, ?, ?)",
+                   (model_hash, EXTRACTOR_VERSION, material_rules_digest()))
+
+def load_model_extracts(model_path, cache_path=None, perf=None):
+    """
+    Yield ColumnExtracts for every storey-contained column of the model.
+    With a cache, an unchanged model (same content hash + EXTRACTOR_VERSION) is not opened at all.
+    Returns (extracts, info) where info["cached"] tells which path was taken.
+    """
+    perf = new_perf() if perf is None else perf
+    db = model_hash = None
+    if cache_path:
+        with stage(perf, "cache_lookup"):
+            db = _open_cache(cache_path)
+            model_hash = model_file_hash(model_path, db)
+            cached = _cached_extracts(db, model_hash)
+        if cached is not None:
+            count(perf, "cache.hit")
+            return cached, {"cached": True, "model_hash": model_hash, "mat_cache": None, "db": db}
+        count(perf, "cache.miss")
+
+    with stage(perf, "open"):
+        model = ifcopenshell.open(model_path)
+    with stage(perf, "units"):
+        to_m = length_unit_scale_to_m(model)
+    with stage(perf, "storey"):
+        index = build_spatial_index(model)
+        columns = iter_model_columns(index)
+    count(perf, "columns", len(columns))
+    count(perf, "storey.by_elevation", len(index["placed"]))
+    with stage(perf, "load_takedown"):
+        takedown = load_takedown(model, columns, index, to_m)
+    count(perf, "load.tributary", sum(t[0] is not None for t in takedown.values()))
+    count(perf, "load.stacked", sum(t[1] > 1 for t in takedown.values()))
+    mat_cache = new_material_cache()
+    extracts = with_load_takedown(iter_column_extracts(model, columns, to_m, index, mat_cache, perf=perf), takedown)
+    if db is not None:
+        extracts = _store_extracts(db, model_hash, extracts)
+    return extracts, {"cached": False, "model_hash": model_hash, "mat_cache": mat_cache, "db": db}
+
+# ---------- Summaries ----------
+SLAB_LOAD_WARNING = "slab load set, but no checked column carries slab area (no IfcSlab found?); Ned used throughout"
+
+def new_summary():
+    """Running OK / insufficient counts and worst utilization."""
+    return {"ok": 0, "nok": 0, "unknown": 0, "worst": None, "slab_carried": 0}
+
+def add_to_summary(summ, r):
+    """Fold one ColumnResult into a running summary."""
+    if r.trib_m2 is not None:
+        summ["slab_carried"] += 1
+    if r.Nrd is None:
+        summ["unknown"] += 1
+        return
+    summ["ok" if r.status == "OK" else "nok"] += 1
+    if summ["worst"] is None or r.util > summ["worst"].util:
+        summ["worst"] = r
+
+def summarize_results(results):
+    """OK / insufficient counts and the worst utilization over `results`."""
+    summ = new_summary()
+    for r in results:
+        add_to_summary(summ, r)
+    return summ
+
+def _storeys_by_elevation(elev):
+    return sorted(elev, key=lambda n: (elev[n] is None, elev[n] or 0.0))
+
+def storey_view(results, match=None):
+    """Single-storey view over all-storey results (matches Name/LongName as is_storey_match); lazy."""
+    if match is None:
+        return iter(results)
+    match = match.lower()
+    return (r for r in results if match in (r.storey_names or r.storey).lower())
+
+# ---------- Report writers (streaming) ----------
+def print_column(r, file=None):
+    """Per-column report block."""
+    dim_txt = f"{r.w_mm:.0f} × {r.h_mm:.0f} mm" if r.w_mm is not None else "<unknown>"
+    A_txt = f"{'~' if r.approx else ''}{r.A_m2*1e6:.0f} mm²" if r.A_m2 is not None else "<unknown>"
+    if r.area_src == "qto":
+        A_txt += " (Qto)"
+    name_txt = ", ".join(r.names[:2]) if r.names else "<unknown>"
+    print(f"- GlobalId: {r.gid}", file=file)
+    print(f"  Storey: {r.storey}", file=file)
+    print(f"  Dimensions: {dim_txt} | A = {A_txt}", file=file)
+    print(f"  Material: {r.mcls} ({name_txt}) | fc used = {r.fc:.1f} N/mm² (source: {r.fc_src})", file=file)
+    if r.A_alt_m2 is not None:
+        print(f"  Check: Qto CrossSectionArea differs from the profile area ({r.A_alt_m2*1e6:.0f} mm²)", file=file)
+    if r.trib_m2 is not None:
+        print(f"  Tributary slab area: {r.trib_m2:.2f} m²", file=file)
+    if r.stack_n > 1:
+        print(f"  Stacked: {r.stack_n - 1} column(s) above → cumulative Ned", file=file)
+    if r.Nrd is not None and r.Nb_rd is not None:
+        print(f"  Nrd = {r.Nrd:.1f} kN  vs  Ned = {r.Ned:.1f} kN  (axial utilization = {r.util_axial:.2f}%)", file=file)
+        print(f"  Nb,Rd = {r.Nb_rd:.1f} kN (χ = {r.chi:.3f}, λ̄ = {r.lam:.2f}, L0 = {r.L0_m:.2f} m)"
+              f"  → {r.status} (utilization = {r.util:.2f}%)", file=file)
+    elif r.Nrd is not None:
+        print(f"  Nrd = {r.Nrd:.1f} kN  vs  Ned = {r.Ned:.1f} kN  → {r.status} (utilization = {r.util:.2f}%)", file=file)
+    else:
+        print(f"  Nrd = <unknown> (missing area/dimensions)", file=file)
+    print("", file=file)
+
+def _worst_txt(worst):
+    dim = f"{worst.w_mm:.0f}×{worst.h_mm:.0f} mm" if worst.w_mm is not None else "<unknown>"
+    return f"{worst.util:.2f}%  (GlobalId {worst.gid}, Nrd={worst.Nrd:.1f} kN, dim≈ {dim})"
+
+class TextReportWriter:
+    """The human-readable Capacity.control.report.txt format."""
+    def __init__(self, f, model_path, cfg):
+        self.f = f
+        self.cfg = cfg
+        self.storeys = {}  # name -> running summary (constant memory per storey)
+        self.elev = {}
+        match_txt = cfg.storey_match if cfg.storey_match is not None else "<all storeys>"
+        print("CAPACITY CONTROL REPORT (IfcColumn, storey match: '{}')".format(match_txt), file=f)
+        print(f"Ned = {cfg.Ned:.2f} kN | gamma_mo = {cfg.gamma_mo:.2f} | fc_default = {cfg.fc_default:.1f} N/mm²", file=f)
+        if cfg.slab_load is not None:
+            print(f"Ned per column = tributary slab area × {cfg.slab_load:.2f} kN/m² (Ned above where no slab is carried)", file=f)
+        if cfg.stack_loads:
+            print("Stacked loads: on (the loads above are per storey, summed down each column stack)", file=f)
+        print(f"Model: {model_path}", file=f)
+        print("-"*80, file=f)
+
+    def write(self, r):
+        print_column(r, file=self.f)
+        add_to_summary(self.storeys.setdefault(r.storey, new_summary()), r)
+        self.elev.setdefault(r.storey, r.storey_elev)
+
+    def close(self, summ, mat_cache=None):
+        f = self.f
+        # Per-storey summary
+        print("-"*80, file=f)
+        for name in _storeys_by_elevation(self.elev):
+            ss = self.storeys[name]
+            worst = f" | worst {ss['worst'].util:.2f}%" if ss["worst"] else ""
+            print(f"{name}: {ss['ok'] + ss['nok']} checked | OK: {ss['ok']} | "
+                  f"Maybe insufficient: {ss['nok']}{worst}", file=f)
 
         # Summary
-        print("-"*80)
-        total = ok_cnt + nok_cnt
-        print(f"TOTAL: {total} checked columns | OK: {ok_cnt} | Maybe insufficient: {nok_cnt}")
-        if worst["gid"] is not None:
-            print(f"Worst utilization: {worst['util']:.2f}%  (GlobalId {worst['gid']}, Nrd={worst['Nrd']:.1f} kN, "
-                  f"dim≈ {worst['w']:.0f}×{worst['h']:.0f} mm)")
-        print("End of report.")
+        print("-"*80, file=f)
+        total = summ["ok"] + summ["nok"]
+        print(f"TOTAL: {total} checked columns | OK: {summ['ok']} | Maybe insufficient: {summ['nok']}", file=f)
+        if summ["worst"] is not None:
+            print(f"Worst utilization: {_worst_txt(summ['worst'])}", file=f)
+        if self.cfg.slab_load is not None and not summ["slab_carried"]:
+            print(f"Warning: {SLAB_LOAD_WARNING}", file=f)
+        if mat_cache is not None:
+            print(f"Material cache: {len(mat_cache['entries'])} unique definitions "
+                  f"({mat_cache['hits']} hits / {mat_cache['misses']} misses)", file=f)
+        print("End of report.", file=f)
+
+def _plain(v):
+    """JSON/CSV friendly value: tuples -> lists, NaN/inf -> None."""
+    if isinstance(v, tuple):
+        return list(v)
+    if isinstance(v, float) and not math.isfinite(v):
+        return None
+    return v
+
+class JsonlWriter:
+    """One JSON object per column per line."""
+    def __init__(self, f, model_path=None, cfg=None):
+        self.f = f
+        self.model_path = model_path
+
+    def write(self, r):
+        rec = {k: _plain(v) for k, v in r._asdict().items()}
+        rec["model"] = self.model_path
+        self.f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+    def close(self, summ, mat_cache=None):
+        pass
+
+class CsvWriter:
+    """One CSV row per column (material names joined with '; ')."""
+    def __init__(self, f, model_path=None, cfg=None):
+        self.w = csv.writer(f)
+        self.w.writerow(ColumnResult._fields)
+
+    def write(self, r):
+        row = [_plain(v) for v in r]
+        row[ColumnResult._fields.index("names")] = "; ".join(r.names)
+        self.w.writerow(["" if v is None else v for v in row])
+
+    def close(self, summ, mat_cache=None):
+        pass
+
+WRITERS = {"text": (TextReportWriter, ".txt"), "jsonl": (JsonlWriter, ".jsonl"), "csv": (CsvWriter, ".csv")}
+
+def stream_results(results, writers, mat_cache=None, perf=None):
+    """Feed every result to every writer as it is produced; returns the overall summary."""
+    perf = new_perf() if perf is None else perf
+    summ = new_summary()
+    for r in results:
+        t0 = time.perf_counter()
+        add_to_summary(summ, r)
+        for w in writers:
+            w.write(r)
+        add_time(perf, "report", time.perf_counter() - t0)
+    with stage(perf, "report"):
+        for w in writers:
+            w.close(summ, mat_cache)
+    return summ
+
+def output_paths(report_path, formats):
+    """{format: path}; the text report keeps `report_path`, others swap the extension."""
+    base = os.path.splitext(report_path)[0]
+    return {fmt: report_path if fmt == "text" else base + WRITERS[fmt][1] for fmt in formats}
+
+# ---------- Incremental re-check (GlobalId + fingerprint diff) ----------
+_SKIP_ATTRS = ("GlobalId", "OwnerHistory")  # change every export without changing the check
+
+def _value_digest(v, memo):
+    if isinstance(v, ifcopenshell.entity_instance):
+        return _entity_digest(v, memo)
+    if isinstance(v, (tuple, list)):
+        return "(" + ",".join(_value_digest(x, memo) for x in v) + ")"
+    return repr(v)
+
+def _entity_digest(e, memo):
+    """Id-independent digest of an entity and everything it references (memoized per entity)."""
+    if e is None:
+        return "$"
+    eid = e.id()
+    if eid == 0:  # inline typed value, e.g. IfcLengthMeasure(3.0)
+        return f"{e.is_a()}({e.wrappedValue!r})"
+    d = memo.get(eid)
+    if d is not None:
+        return d
+    memo[eid] = "<cycle>"
+    names = getattr(e, "wrapped_data", e).get_attribute_names()
+    parts = [e.is_a()] + [_value_digest(v, memo) for n, v in zip(names, e) if n not in _SKIP_ATTRS]
+    d = hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:20]
+    memo[eid] = d
+    return d
+
+def column_fingerprint(col, index, to_m, memo):
+    """
+    Digest of everything the capacity check reads for `col`: placement, representation,
+    storey, material associations (+ their property sets), type and base quantities, plus the unit scale.
+    """
+    parts = [repr(to_m), _entity_digest(col.ObjectPlacement, memo), _entity_digest(col.Representation, memo)]
+    st = index["storey_of"].get(col.id())
+    parts.append(repr(_storey_key(st)) if st else "$")
+    owners = [col] + [t_rel.RelatingType for t_rel in (col.IsTypedBy or [])]
+    for owner in owners:
+        if owner is not col:
+            parts.append(_entity_digest(owner, memo))
+        for rel in (owner.HasAssociations or []):
+            if rel.is_a("IfcRelAssociatesMaterial"):
+                md = rel.RelatingMaterial
+                parts.append(_entity_digest(md, memo))
+                parts.extend(_entity_digest(ps, memo) for ps in _iter_material_property_sets(md))
+    for rel in (col.IsDefinedBy or []):
+        if rel.is_a("IfcRelDefinesByProperties"):
+            parts.extend(_entity_digest(d, memo) for d in property_definitions(rel.RelatingPropertyDefinition)
+                         if d.is_a("IfcElementQuantity") and d.Name == QTO_COLUMN)
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+def column_fingerprints(columns, index, to_m):
+    """{GlobalId: fingerprint}; shared profiles/materials/types are digested once."""
+    memo = {}
+    return {col.GlobalId: column_fingerprint(col, index, to_m, memo) for col in columns}
+
+def _store_fingerprints(db, model_hash, fps):
+    with db:
+        db.execute("DELETE FROM fingerprints WHERE model_hash=? AND version=?", (model_hash, EXTRACTOR_VERSION))
+        db.executemany("INSERT INTO fingerprints VALUES (?, ?, ?, ?)",
+                       ((model_hash, EXTRACTOR_VERSION, gid, fp) for gid, fp in fps.items()))
+
+def _load_run(model_path, db):
+    """(extracts, fingerprints) of a model from the cache, extracting only what's missing."""
+    model_hash = model_file_hash(model_path, db)
+    fps = dict(db.execute("SELECT gid, fp FROM fingerprints WHERE model_hash=? AND version=?",
+                          (model_hash, EXTRACTOR_VERSION)).fetchall())
+    cached = _cached_extracts(db, model_hash)
+    if cached is not None and fps:
+        return list(cached), fps
+
+    model = ifcopenshell.open(model_path)
+    to_m = length_unit_scale_to_m(model)
+    index = build_spatial_index(model)
+    columns = iter_model_columns(index)
+    fps = column_fingerprints(columns, index, to_m)
+    _store_fingerprints(db, model_hash, fps)
+    if cached is not None:
+        return list(cached), fps
+    takedown = load_takedown(model, columns, index, to_m)
+    extracts = with_load_takedown(iter_column_extracts(model, columns, to_m, index), takedown)
+    return list(_store_extracts(db, model_hash, extracts)), fps
+
+def _load_fields(cfg):
+    """Load takedown fields (redone for every column per revision) that enter Ned under `cfg`."""
+    fields = ("trib_m2",) if cfg.slab_load is not None else ()
+    if cfg.stack_loads:
+        fields += ("stack_n", "stack_trib_n", "stack_trib_m2") if cfg.slab_load is not None else ("stack_n",)
+    return fields
+
+def diff_revisions(prev_model_path, model_path, cache_path=None, cfg=None):
+    """
+    Compare a new revision with the previous one by GlobalId + fingerprint and re-extract
+    only added / changed columns. Columns whose own fingerprint is unchanged but whose load
+    (slab area, stack) moved with their neighbours also count as modified, when that load
+    enters Ned under `cfg` (slab_load / stack_loads).
+    Returns (merged extracts in new model order, delta dict).
+    The merged run is cached for the new model, so revisions can be chained.
+    """
+    fields = _load_fields(cfg or default_config())
+    load_key = lambda x: tuple(getattr(x, f) for f in fields)
+    db = _open_cache(cache_path or ":memory:")
+    try:
+        prev_extracts, prev_fps = _load_run(prev_model_path, db)
+        prev = {x.gid: x for x in prev_extracts}
+
+        model = ifcopenshell.open(model_path)
+        to_m = length_unit_scale_to_m(model)
+        index = build_spatial_index(model)
+        columns = iter_model_columns(index)
+        fps = column_fingerprints(columns, index, to_m)
+
+        added = [c for c in columns if c.GlobalId not in prev]
+        changed = [c for c in columns if c.GlobalId in prev and prev_fps.get(c.GlobalId) != fps[c.GlobalId]]
+        removed = [x for gid, x in prev.items() if gid not in fps]
+
+        fresh = {x.gid: x for x in iter_column_extracts(model, added + changed, to_m, index)}
+        # tributary areas and stacks depend on neighbouring columns and slabs, so they are redone for all
+        takedown = load_takedown(model, columns, index, to_m)
+        merged = list(with_load_takedown((fresh.get(c.GlobalId) or prev[c.GlobalId] for c in columns), takedown))
+        fresh = {x.gid: x for x in merged}
+        load_moved = {c.GlobalId for c in columns
+                      if c.GlobalId in prev and load_key(prev[c.GlobalId]) != load_key(fresh[c.GlobalId])}
+        changed_ids = {c.GlobalId for c in changed}
+        modified = [c for c in columns if c.GlobalId in changed_ids or c.GlobalId in load_moved]
+
+        model_hash = model_file_hash(model_path, db)
+        for _ in _store_extracts(db, model_hash, merged):
+            pass
+        _store_fingerprints(db, model_hash, fps)
+    finally:
+        db.close()
+
+    delta = {
+        "added": [fresh[c.GlobalId] for c in added],
+        "removed": removed,
+        "modified": [(prev[c.GlobalId], fresh[c.GlobalId]) for c in modified],
+        "unchanged": len(columns) - len(added) - len(modified),
+    }
+    return merged, delta
+
+def _delta_line(r):
+    dim = f"{r.w_mm:.0f}×{r.h_mm:.0f} mm" if r.w_mm is not None else "<unknown>"
+    util = f"{r.util:.2f}%" if r.Nrd is not None else "<unknown>"
+    return f"{r.storey} | {dim} | fc {r.fc:.1f} | Ned {r.Ned:.1f} kN | {r.status} ({util})"
+
+def write_delta_report(delta, prev_model_path, model_path, f, cfg=None):
+    """Text report of what changed between two revisions and how the check result moved."""
+    cfg = cfg or default_config()
+    print("CAPACITY CONTROL DELTA REPORT (IfcColumn)", file=f)
+    print(f"Previous: {prev_model_path}", file=f)
+    print(f"Current:  {model_path}", file=f)
+    print(f"Ned = {cfg.Ned:.2f} kN | gamma_mo = {cfg.gamma_mo:.2f} | fc_default = {cfg.fc_default:.1f} N/mm²", file=f)
+    if cfg.slab_load is not None:
+        print(f"Ned per column = tributary slab area × {cfg.slab_load:.2f} kN/m²", file=f)
+    if cfg.stack_loads:
+        print("Stacked loads: on (the loads above are per storey, summed down each column stack)", file=f)
+    print("-"*80, file=f)
+    for x in delta["added"]:
+        print(f"+ {x.gid}: {_delta_line(check_column(x, cfg))}", file=f)
+    for x in delta["removed"]:
+        print(f"- {x.gid}: {_delta_line(check_column(x, cfg))}", file=f)
+    for old, new in delta["modified"]:
+        r_old, r_new = check_column(old, cfg), check_column(new, cfg)
+        flag = "  STATUS CHANGED" if r_old.status != r_new.status else ""
+        print(f"~ {new.gid}: {_delta_line(r_old)}  →  {_delta_line(r_new)}{flag}", file=f)
+    print("-"*80, file=f)
+    print(f"Added: {len(delta['added'])} | Removed: {len(delta['removed'])} | "
+          f"Modified: {len(delta['modified'])} | Unchanged: {delta['unchanged']}", file=f)
+    print("End of delta report.", file=f)
+
+def run_incremental(prev_model_path, model_path, report_path, cfg=None):
+    """Delta report (<report>.delta.txt) plus the merged full report for the new revision."""
+    cfg = cfg or default_config()
+    merged, delta = diff_revisions(prev_model_path, model_path, cfg.cache_path, cfg)
+    with open(os.path.splitext(report_path)[0] + ".delta.txt", "w", encoding="utf-8") as f:
+        write_delta_report(delta, prev_model_path, model_path, f, cfg)
+    summ = write_reports(iter_checks(merged, cfg), report_path, model_path, cfg)
+    return summ, delta
+
+# ---------- Parametric sweep (vectorized) ----------
+SWEEP_CELLS = 4_000_000  # max column × case cells evaluated at once (bounds memory)
+
+def sweep_capacity(extracts, Ned_values, gamma_values, fc_values=None, override_fc=False, cfg=None):
+    """
+    Evaluate every column against the full grid Ned × gamma_mo × fc as NumPy broadcasts.
+    fc_values replace fc_default for columns without an extracted fc (or all columns
+    if override_fc). The loads and resistances follow check_columns for the rest of cfg
+    (slab_load, stack_loads, buckling), so a case equal to cfg gives the same utilizations
+    as run_capacity_check. Returns a dict with the grid, the governing case per column and
+    the pass-rate surface (shape: len(Ned) × len(gamma) × len(fc)).
+    """
+    xs = list(extracts)
+    Ned_v = np.atleast_1d(np.asarray(Ned_values, dtype=float))
+    gam_v = np.atleast_1d(np.asarray(gamma_values, dtype=float))
+    cfg = cfg or default_config()
+    fc_v = np.atleast_1d(np.asarray([cfg.fc_default] if fc_values is None else fc_values, dtype=float))
+    shape = (len(Ned_v), len(gam_v), len(fc_v))
+    n_cases = int(np.prod(shape))
+
+    A = np.array([np.nan if x.A_m2 is None else x.A_m2 for x in xs], dtype=float)
+    fc_col = np.array([np.nan if (x.fc is None or override_fc) else x.fc for x in xs], dtype=float)
+    fc_all = np.where(np.isnan(fc_col[:, None]), fc_v[None, :], fc_col[:, None])          # (columns, F)
+    _, fixed, per_Ned = _load_terms(xs, cfg) if xs else (None, np.zeros(0), np.zeros(0))
+    # χ·Nrd is the governing resistance when buckling is checked (χ ≤ 1); χ depends on fc only
+    chi = _buckling_terms(xs, A, fc_all, cfg)[0] if cfg.buckling and xs else np.full(fc_all.shape, np.nan)
+    chi = np.where(np.isnan(chi), 1.0, chi)
+    known = np.isfinite(A)
+
+    gov_case = np.full(len(xs), -1, dtype=np.int64)
+    gov_util = np.full(len(xs), np.nan)
+    passes = np.zeros(shape, dtype=np.int64)
+
+    step = max(1, SWEEP_CELLS // n_cases)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for a in range(0, len(xs), step):
+            sl = slice(a, a + step)
+            fc = fc_all[sl]                                                                  # (c, F)
+            Nrd = fc[:, None, :] * (A[sl, None, None] * 1e6) / gam_v[None, :, None] / 1000.0  # (c, G, F) kN
+            Nrd4 = (Nrd * chi[sl, None, :])[:, None, :, :]                                   # (c, 1, G, F)
+            Ned4 = (fixed[sl, None] + per_Ned[sl, None] * Ned_v[None, :])[:, :, None, None]  # (c, L, 1, 1)
+            util = np.where(Nrd4 > 0, Ned4 / Nrd4 * 100.0, np.inf).reshape(len(fc), -1)
+            idx = np.argmax(util, axis=1)
+            gov_case[sl] = idx
+            gov_util[sl] = util[np.arange(len(idx)), idx]
+            passes += (Nrd4 >= Ned4).sum(axis=0)
+
+    gov_case[~known] = -1
+    gov_util[~known] = np.nan
+    n_known = int(known.sum())
+    return {
+        "gids": [x.gid for x in xs], "storeys": [x.storey for x in xs],
+        "Ned": Ned_v, "gamma_mo": gam_v, "fc": fc_v,
+        "governing_case": gov_case, "governing_util": gov_util,
+        "pass_rate": passes / n_known if n_known else np.full(shape, np.nan),
+        "n_known": n_known,
+    }
+
+def write_sweep(sweep, out_prefix):
+    """<prefix>.governing.csv (worst case per column) and <prefix>.passrate.csv (surface, long format)."""
+    shape = (len(sweep["Ned"]), len(sweep["gamma_mo"]), len(sweep["fc"]))
+    with open(out_prefix + ".governing.csv", "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["gid", "storey", "Ned", "gamma_mo", "fc", "util", "status"])
+        for gid, st, case, util in zip(sweep["gids"], sweep["storeys"], sweep["governing_case"], sweep["governing_util"]):
+            if case < 0:
+                w.writerow([gid, st, "", "", "", "", "UNKNOWN"])
+                continue
+            i, j, k = np.unravel_index(case, shape)
+            status = "OK" if util <= 100.0 else "Maybe insufficient"
+            w.writerow([gid, st, sweep["Ned"][i], sweep["gamma_mo"][j], sweep["fc"][k], f"{util:.2f}", status])
+    with open(out_prefix + ".passrate.csv", "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["Ned", "gamma_mo", "fc", "pass_rate"])
+        for (i, j, k), rate in np.ndenumerate(sweep["pass_rate"]):
+            w.writerow([sweep["Ned"][i], sweep["gamma_mo"][j], sweep["fc"][k], f"{rate:.4f}"])
+
+def run_sweep(model_path, out_prefix, Ned_values, gamma_values, fc_values=None, override_fc=False, cfg=None):
+    """Sweep one model's columns (cfg.storey_match view, extraction cache aware) and write the sweep CSVs."""
+    cfg = cfg or default_config()
+    extracts, info = load_model_extracts(model_path, cfg.cache_path)
+    try:
+        sweep = sweep_capacity(storey_view(extracts, cfg.storey_match), Ned_values, gamma_values,
+                               fc_values, override_fc, cfg)
+    finally:
+        if info["db"] is not None:
+            info["db"].close()
+    write_sweep(sweep, out_prefix)
+    return sweep
+
+# ---------- Main: generate reports ----------
+def write_reports(results, report_path, model_path, cfg, mat_cache=None, perf=None):
+    """Stream `results` (cfg.storey_match view) to every cfg.output_formats writer; returns the summary."""
+    files, writers = [], []
+    try:
+        for fmt, path in output_paths(report_path, cfg.output_formats).items():
+            f = open(path, "w", encoding="utf-8", newline="" if fmt == "csv" else None)
+            files.append(f)
+            writers.append(WRITERS[fmt][0](f, model_path, cfg))
+        return stream_results(storey_view(results, cfg.storey_match), writers, mat_cache, perf)
+    finally:
+        for f in files:
+            f.close()
+
+def run_capacity_check(model_path, report_path, cfg=None):
+    """
+    Evaluate all columns of one model (from the extraction cache when possible) and stream
+    them to the report writers. Returns a small summary dict for the cfg.storey_match view.
+    Writes <report>.profile.json (stage timers / path counters) and optionally <report>.cprofile.
+    """
+    cfg = cfg or default_config()
+    base = os.path.splitext(report_path)[0]
+    perf = new_perf()
+    profiler = cProfile.Profile() if cfg.cprofile else None
+    if profiler:
+        profiler.enable()
+    t0 = time.perf_counter()
+
+    extracts, info = load_model_extracts(model_path, cfg.cache_path, perf)
+
+    # One traversal over every contained column; the storey match is only a view
+    results = iter_checks(extracts, cfg, perf=perf)
+    try:
+        summ = write_reports(results, report_path, model_path, cfg, info["mat_cache"], perf)
+    finally:
+        if info["db"] is not None:
+            info["db"].close()
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(base + ".cprofile")
+
+    wall = time.perf_counter() - t0
+    if cfg.write_profile:
+        mc = info["mat_cache"]
+        # stages don't overlap; "untimed_s" is the rest (per-column area / dimension work, cache writes)
+        write_perf(perf, base + ".profile.json", model=model_path, cached=info["cached"], wall_s=round(wall, 6),
+                   untimed_s=round(wall - sum(perf["stages"].values()), 6),
+                   material_cache={"unique": len(mc["entries"]), "hits": mc["hits"], "misses": mc["misses"]} if mc else None)
+
+    worst = summ["worst"]
+    return {
+        "model": model_path, "report": report_path, "cached": info["cached"],
+        "checked": summ["ok"] + summ["nok"], "ok": summ["ok"], "nok": summ["nok"],
+        "unknown": summ["unknown"], "slab_carried": summ["slab_carried"],
+        "worst_util": worst.util if worst else None, "worst_gid": worst.gid if worst else None,
+    }
+
+# ---------- Command line ----------
+def build_arg_parser():
+    """CLI; every default comes from the USER SETTINGS block."""
+    ap = argparse.ArgumentParser(prog="python -m A3", description="Axial capacity check (Nrd = fc·A/γ) of IfcColumns.")
+    ap.add_argument("model", nargs="?", default=MODEL_PATH, help=f"IFC model (default: {MODEL_PATH})")
+    ap.add_argument("--storey", default=STOREY_MATCH, help="storey Name/LongName text; 'all' for every storey")
+    ap.add_argument("--Ned", type=float, default=Ned, help="design axial load [kN]")
+    ap.add_argument("--gamma", type=float, default=gamma_mo, help="material safety factor gamma_mo")
+    ap.add_argument("--fc-default", type=float, default=fc_default, help="fc if none is found [N/mm²]")
+    ap.add_argument("--slab-load", type=float, default=SLAB_LOAD,
+                    help="design floor load [kN/m²]: Ned per column from its tributary slab area")
+    ap.add_argument("--format", action="append", choices=sorted(WRITERS), dest="formats",
+                    help="report format; repeat for several (default: %s)" % ", ".join(OUTPUT_FORMATS))
+    ap.add_argument("--report", default="Capacity.control.report.txt", help="text report path (others sit next to it)")
+    ap.add_argument("--cache", default=CACHE_PATH, help="extraction cache file; 'none' to disable")
+    ap.add_argument("--previous", help="previous revision of the model: incremental re-check + delta report")
+    ap.add_argument("--no-buckling", action="store_true", help="axial (squashing) check only")
+    ap.add_argument("--buckling-k", type=float, default=BUCKLING_K, help="effective length factor L0 / L")
+    ap.add_argument("--stacks", action="store_true",
+                    help="treat Ned / slab load as per storey and sum them down column stacks")
+    ap.add_argument("--no-stacks", action="store_true",
+                    help="check each column with its own load only (overrides STACK_LOADS = True)")
+    ap.add_argument("--no-profile", action="store_true", help="don't write <report>.profile.json")
+    ap.add_argument("--cprofile", action="store_true", help="dump a cProfile of the run to <report>.cprofile")
+    return ap
+
+def config_from_args(args):
+    """CheckConfig from parsed CLI arguments."""
+    storey = None if (args.storey or "").lower() == "all" else args.storey
+    cache = None if (args.cache or "").lower() == "none" else args.cache
+    return default_config(
+        Ned=args.Ned, gamma_mo=args.gamma, fc_default=args.fc_default, slab_load=args.slab_load,
+        stack_loads=(STACK_LOADS or args.stacks) and not args.no_stacks, buckling=BUCKLING and not args.no_buckling,
+        buckling_k=args.buckling_k, storey_match=storey,
+        output_formats=tuple(args.formats or OUTPUT_FORMATS), cache_path=cache,
+        write_profile=not args.no_profile, cprofile=args.cprofile or CPROFILE,
+    )
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    cfg = config_from_args(args)
+    if args.previous:
+        summ, delta = run_incremental(args.previous, args.model, args.report, cfg)
+        print(f"{args.model}: {summ['ok'] + summ['nok']} checked | OK: {summ['ok']} | "
+              f"Maybe insufficient: {summ['nok']} | added {len(delta['added'])}, removed {len(delta['removed'])}, "
+              f"modified {len(delta['modified'])}")
+        return
+    out = run_capacity_check(args.model, args.report, cfg)
+    if cfg.slab_load is not None and out["checked"] and not out["slab_carried"]:
+        print(f"Warning: {SLAB_LOAD_WARNING}", file=sys.stderr)
+    print(f"{args.model}: {out['checked']} checked | OK: {out['ok']} | Maybe insufficient: {out['nok']} "
+          f"→ {args.report}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,38 @@
+"""
+Column capacity check (A3) as a library.
+
+    from A3 import default_config, run_capacity_check
+    cfg = default_config(storey_match=None, Ned=1200.0, output_formats=("text", "jsonl"))
+    run_capacity_check("model.ifc", "Capacity.control.report.txt", cfg)
+
+Command line: python -m A3 model.ifc --storey all --Ned 1200 --format jsonl
+The geometry engine is only loaded when a column needs the bounding-box fallback.
+"""
+from .A3 import (
+    CheckConfig,
+    ColumnExtract,
+    ColumnResult,
+    WRITERS,
+    build_spatial_index,
+    capacity_kN,
+    check_column,
+    check_columns,
+    column_stacks,
+    default_config,
+    diff_revisions,
+    evaluate_columns,
+    iter_column_extracts,
+    iter_column_results,
+    iter_model_columns,
+    length_unit_scale_to_m,
+    load_model_extracts,
+    load_takedown,
+    main,
+    run_capacity_check,
+    run_incremental,
+    run_sweep,
+    summarize_results,
+    sweep_capacity,
+    tributary_areas,
+    write_reports,
+)
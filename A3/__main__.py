@@ -0,0 +1,3 @@
+from .A3 import main
+
+main()
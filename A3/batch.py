@@ -0,0 +1,128 @@
+"""
+Batch runner: the column capacity check over many IFC models in a process pool.
+
+    python -m A3.batch models/ "revisions/*.ifc" --workers 8 --out reports/
+
+Each worker opens its own model and writes one report per model; a combined
+summary table (with wall time and peak memory per model) is written to
+<out>/batch.summary.txt and printed.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from .A3 import STOREY_MATCH, WRITERS, default_config, run_capacity_check
+
+def find_models(patterns):
+    """Expand directories (recursively) and glob patterns to a sorted list of .ifc files."""
+    paths = set()
+    for pat in patterns:
+        if os.path.isdir(pat):
+            paths.update(glob.glob(os.path.join(pat, "**", "*.ifc"), recursive=True))
+        else:
+            paths.update(p for p in glob.glob(pat, recursive=True) if os.path.isfile(p))
+    return sorted(paths)
+
+def _peak_rss_mb():
+    """Peak resident memory of this process in MB (None if unavailable)."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024.0 * 1024.0) if sys.platform == "darwin" else rss / 1024.0  # bytes vs KB
+
+def _check_one(job):
+    """Worker: run one model (one process per model, so peak RSS is per model)."""
+    model_path, report_path, cfg = job
+    t0 = time.perf_counter()
+    try:
+        out = run_capacity_check(model_path, report_path, cfg)
+        out["error"] = None
+    except Exception as e:
+        out = {"model": model_path, "report": None, "error": f"{type(e).__name__}: {e}"}
+    out["seconds"] = time.perf_counter() - t0
+    out["peak_mb"] = _peak_rss_mb()
+    return out
+
+def _report_names(models, out_dir):
+    """One report path per model; duplicate file stems get a numeric suffix."""
+    seen, names = {}, []
+    for m in models:
+        stem = os.path.splitext(os.path.basename(m))[0]
+        n = seen.get(stem, 0)
+        seen[stem] = n + 1
+        suffix = f"-{n}" if n else ""
+        names.append(os.path.join(out_dir, f"{stem}{suffix}.capacity.report.txt"))
+    return names
+
+def run_batch(models, out_dir, cfg=None, workers=None):
+    """Check all `models` in a process pool; returns one summary dict per model (input order)."""
+    cfg = cfg or default_config()
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = [(m, r, cfg) for m, r in zip(models, _report_names(models, out_dir))]
+    # maxtasksperchild=1: fresh process per model, keeps memory bounded and peak RSS honest
+    with Pool(processes=workers or os.cpu_count() or 1, maxtasksperchild=1) as pool:
+        done = {}
+        for res in pool.imap_unordered(_check_one, jobs):
+            done[res["model"]] = res
+            status = res["error"] or f"{res['checked']} checked, {res['nok']} maybe insufficient"
+            print(f"[{len(done)}/{len(jobs)}] {res['model']}: {status} ({res['seconds']:.1f} s)", flush=True)
+    return [done[m] for m in models]
+
+def _fmt(x, spec, none="-"):
+    return none if x is None else format(x, spec)
+
+def write_summary(results, path):
+    """Combined summary table over all models (text)."""
+    head = f"{'Model':<40} {'Checked':>7} {'OK':>6} {'Insuff.':>7} {'Unknown':>7} {'Worst %':>8} {'Time s':>7} {'Peak MB':>8}"
+    lines = ["BATCH CAPACITY CONTROL SUMMARY", head, "-"*len(head)]
+    for r in results:
+        name = os.path.basename(r["model"])
+        if r["error"]:
+            lines.append(f"{name:<40} ERROR: {r['error']}")
+            continue
+        lines.append(f"{name:<40} {r['checked']:>7} {r['ok']:>6} {r['nok']:>7} {r['unknown']:>7} "
+                     f"{_fmt(r['worst_util'], '.2f'):>8} {r['seconds']:>7.1f} {_fmt(r['peak_mb'], '.0f'):>8}")
+    ok = [r for r in results if not r["error"]]
+    lines.append("-"*len(head))
+    lines.append(f"MODELS: {len(results)} | failed: {len(results) - len(ok)} | "
+                 f"columns checked: {sum(r['checked'] for r in ok)} | "
+                 f"maybe insufficient: {sum(r['nok'] for r in ok)} | "
+                 f"total worker time: {sum(r['seconds'] for r in results):.1f} s")
+    text = "\n".join(lines) + "\n"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return text
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Column capacity check over a directory or glob of IFC models.")
+    ap.add_argument("paths", nargs="+", help="IFC files, directories or glob patterns")
+    ap.add_argument("--out", default="capacity_reports", help="output directory for reports")
+    ap.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    ap.add_argument("--storey", default=STOREY_MATCH, help="storey match text; 'all' for every storey")
+    ap.add_argument("--format", action="append", choices=sorted(WRITERS), dest="formats",
+                    help="report format(s); repeat for several (default: text)")
+    args = ap.parse_args(argv)
+
+    models = find_models(args.paths)
+    if not models:
+        ap.error("no .ifc files found")
+    storey = None if (args.storey or "").lower() == "all" else args.storey
+    cfg = default_config(storey_match=storey)
+    if args.formats:
+        cfg = cfg._replace(output_formats=tuple(args.formats))
+
+    t0 = time.perf_counter()
+    results = run_batch(models, args.out, cfg, args.workers)
+    print(write_summary(results, os.path.join(args.out, "batch.summary.txt")), end="")
+    print(f"Wall time: {time.perf_counter() - t0:.1f} s")
+
+if __name__ == "__main__":
+    main()
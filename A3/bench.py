@@ -0,0 +1,330 @@
+"""
+Synthetic IFC models and a stage-by-stage benchmark of the column capacity pipeline.
+
+    python -m A3.bench --sizes 1000 10000 100000 --storeys 10 --out bench_models
+
+Generated models cover the material / profile paths A3 handles (cycled per column):
+  0    IfcMaterialProfileSetUsage on the instance, rectangle, material name 'C30/37'
+  1    IfcMaterialProfileSetUsage on the instance, Pset_MaterialConcrete.CompressiveStrength
+  2    type-level IfcMaterialProfileSet, rectangle, material name 'C40/50'
+  3    type-level IfcMaterialProfileSet, circle profile
+  4    extruded-area profile only (plain IfcMaterial 'Concrete')
+  5    extruded-area I-shape only (steel 'S355')
+  6    extruded IfcArbitraryClosedProfileDef (analytic outline area, no parametric profile)
+  7    IfcTriangulatedFaceSet body, no profile at all (bbox fallback)
+With --clutter N every column gets N extruded IfcWalls next to it (for the pre-filter benchmark).
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+from multiprocessing import Pool
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import ifcopenshell
+import ifcopenshell.guid
+
+from . import A3 as cap
+from .prefilter import prefilter_model
+
+VARIANTS = 8
+STOREY_HEIGHT_MM = 3500.0
+GRID_MM = 6000.0
+
+# ---------- Synthetic model generator ----------
+def _axis(f, xyz=(0.0, 0.0, 0.0)):
+    return f.createIfcAxis2Placement3D(f.createIfcCartesianPoint(xyz), None, None)
+
+def _placement(f, rel_to, xyz):
+    return f.createIfcLocalPlacement(rel_to, _axis(f, xyz))
+
+def _root(f, cls, name=None, **attrs):
+    return f.create_entity(cls, GlobalId=ifcopenshell.guid.new(), Name=name, **attrs)
+
+def _concrete_pset(f, material, fc):
+    """Pset_MaterialConcrete with CompressiveStrength on a material (IfcMaterialProperties)."""
+    prop = f.createIfcPropertySingleValue("CompressiveStrength", None, f.createIfcPressureMeasure(fc), None)
+    return f.createIfcMaterialProperties("Pset_MaterialConcrete", None, [prop], material)
+
+def _profile_set_usage(f, name, material, profile):
+    mps = f.createIfcMaterialProfileSet(name, None, [f.createIfcMaterialProfile(None, None, material, profile, None, None)], None)
+    return mps, f.createIfcMaterialProfileSetUsage(mps, None, None)
+
+def _box_faceset(f, w, h, d):
+    pts = [(x, y, z) for z in (0.0, d) for y in (-h/2, h/2) for x in (-w/2, w/2)]
+    faces = [(1, 2, 4), (1, 4, 3), (5, 7, 8), (5, 8, 6), (1, 5, 6), (1, 6, 2),
+             (3, 4, 8), (3, 8, 7), (1, 3, 7), (1, 7, 5), (2, 6, 8), (2, 8, 4)]
+    return f.createIfcTriangulatedFaceSet(f.createIfcCartesianPointList3D(pts), None, None, faces, None)
+
+def make_model(path, n_columns, n_storeys=10, clutter=0):
+    """Write an IFC4 model (millimetres) with `n_columns` columns spread over `n_storeys` storeys."""
+    f = ifcopenshell.file(schema="IFC4")
+    units = f.createIfcUnitAssignment([
+        f.createIfcSIUnit(None, "LENGTHUNIT", "MILLI", "METRE"),
+        f.createIfcSIUnit(None, "AREAUNIT", None, "SQUARE_METRE"),
+        f.createIfcSIUnit(None, "PRESSUREUNIT", "MEGA", "PASCAL"),
+    ])
+    ctx = f.createIfcGeometricRepresentationContext(None, "Model", 3, 1e-5, _axis(f), None)
+    body = f.createIfcGeometricRepresentationSubContext("Body", "Model", None, None, None, None, ctx, None, "MODEL_VIEW", None)
+    project = _root(f, "IfcProject", "Synthetic", RepresentationContexts=[ctx], UnitsInContext=units)
+
+    site_pl = _placement(f, None, (0.0, 0.0, 0.0))
+    site = _root(f, "IfcSite", "Site", ObjectPlacement=site_pl)
+    bld_pl = _placement(f, site_pl, (0.0, 0.0, 0.0))
+    building = _root(f, "IfcBuilding", "Building", ObjectPlacement=bld_pl)
+    _root(f, "IfcRelAggregates", RelatingObject=project, RelatedObjects=[site])
+    _root(f, "IfcRelAggregates", RelatingObject=site, RelatedObjects=[building])
+
+    storeys = []
+    for s in range(n_storeys):
+        elev = (s - 1) * STOREY_HEIGHT_MM  # first storey is 'Level -1' (basement)
+        pl = _placement(f, bld_pl, (0.0, 0.0, elev))
+        storeys.append(_root(f, "IfcBuildingStorey", f"Level {s - 1}", ObjectPlacement=pl, Elevation=elev))
+    _root(f, "IfcRelAggregates", RelatingObject=building, RelatedObjects=storeys)
+
+    # Shared materials / profiles / types (real models share these between many columns)
+    c30 = f.createIfcMaterial("Concrete C30/37", None, "Concrete")
+    c45 = f.createIfcMaterial("Concrete", None, "Concrete")
+    _concrete_pset(f, c45, 45.0)
+    c40 = f.createIfcMaterial("Concrete C40/50", None, "Concrete")
+    plain = f.createIfcMaterial("Concrete", None, "Concrete")
+    steel = f.createIfcMaterial("Steel S355", None, "Steel")
+    c25 = f.createIfcMaterial("Concrete C25/30", None, "Concrete")
+    betong = f.createIfcMaterial("Betong B35", None, "Concrete")
+
+    rect_a = f.createIfcRectangleProfileDef("AREA", "R300x400", None, 300.0, 400.0)
+    rect_b = f.createIfcRectangleProfileDef("AREA", "R200x700", None, 200.0, 700.0)
+    rect_c = f.createIfcRectangleProfileDef("AREA", "R400x400", None, 400.0, 400.0)
+    circle = f.createIfcCircleProfileDef("AREA", "D400", None, 200.0)
+    ishape = f.createIfcIShapeProfileDef("AREA", "HEA300", None, 300.0, 290.0, 8.5, 14.0, 27.0, None, None)
+    poly = f.createIfcPolyline([f.createIfcCartesianPoint(p) for p in
+                                [(-200.0, -150.0), (200.0, -150.0), (200.0, 150.0), (-200.0, 150.0), (-200.0, -150.0)]])
+    arbitrary = f.createIfcArbitraryClosedProfileDef("AREA", "P400x300", poly)
+
+    _, usage_a = _profile_set_usage(f, "C30 300x400", c30, rect_a)
+    _, usage_b = _profile_set_usage(f, "C45 200x700", c45, rect_b)
+    mps_c, _ = _profile_set_usage(f, "C40 400x400", c40, rect_c)
+    mps_d, _ = _profile_set_usage(f, "C40 D400", c40, circle)
+    type_c = _root(f, "IfcColumnType", "Concrete-Column:400x400", PredefinedType="COLUMN")
+    type_d = _root(f, "IfcColumnType", "Concrete-Column:D400", PredefinedType="COLUMN")
+    _root(f, "IfcRelAssociatesMaterial", RelatedObjects=[type_c], RelatingMaterial=mps_c)
+    _root(f, "IfcRelAssociatesMaterial", RelatedObjects=[type_d], RelatingMaterial=mps_d)
+
+    # variant -> (name, body profile or None for a faceset, material definition, type)
+    variants = [
+        ("Concrete-Column:300x400", rect_a, usage_a, None),
+        ("Concrete-Column:200x700", rect_b, usage_b, None),
+        ("Concrete-Column:400x400", rect_c, None, type_c),
+        ("Concrete-Column:D400", circle, None, type_d),
+        ("Concrete-Column:400x400", rect_c, plain, None),
+        ("Steel-Column:HEA300", ishape, steel, None),
+        ("Concrete-Column:400x300", arbitrary, c25, None),
+        ("Concrete-Column:300x300", None, betong, None),
+    ]
+    faceset = _box_faceset(f, 300.0, 300.0, STOREY_HEIGHT_MM)
+    extrude_dir = f.createIfcDirection((0.0, 0.0, 1.0))
+
+    brick = f.createIfcMaterial("Brick", None, "Masonry")
+    walls = []
+
+    per_storey = [[] for _ in storeys]
+    by_material = {}
+    by_type = {}
+    side = max(1, int((n_columns / max(n_storeys, 1)) ** 0.5) + 1)
+    for i in range(n_columns):
+        s = i % n_storeys
+        k = i // n_storeys
+        name, profile, matdef, ctype = variants[i % VARIANTS]
+        if profile is not None:
+            item = f.createIfcExtrudedAreaSolid(profile, None, extrude_dir, STOREY_HEIGHT_MM)
+            rep = f.createIfcShapeRepresentation(body, "Body", "SweptSolid", [item])
+        else:
+            rep = f.createIfcShapeRepresentation(body, "Body", "Tessellation", [faceset])
+        pl = _placement(f, storeys[s].ObjectPlacement, ((k % side) * GRID_MM, (k // side) * GRID_MM, 0.0))
+        col = _root(f, "IfcColumn", name, ObjectPlacement=pl,
+                    Representation=f.createIfcProductDefinitionShape(None, None, [rep]), PredefinedType="COLUMN")
+        per_storey[s].append(col)
+        if matdef is not None:
+            by_material.setdefault(matdef.id(), (matdef, []))[1].append(col)
+        if ctype is not None:
+            by_type.setdefault(ctype.id(), (ctype, []))[1].append(col)
+        for j in range(clutter):
+            wall_prof = f.createIfcRectangleProfileDef("AREA", None, None, 2000.0, 200.0)
+            wall_rep = f.createIfcShapeRepresentation(body, "Body", "SweptSolid", [
+                f.createIfcExtrudedAreaSolid(wall_prof, None, extrude_dir, STOREY_HEIGHT_MM)])
+            wall = _root(f, "IfcWall", f"Wall {i}.{j}",
+                         ObjectPlacement=_placement(f, pl, (1000.0, 500.0 * (j + 1), 0.0)),
+                         Representation=f.createIfcProductDefinitionShape(None, None, [wall_rep]))
+            per_storey[s].append(wall)
+            walls.append(wall)
+
+    for st, cols in zip(storeys, per_storey):
+        if cols:
+            _root(f, "IfcRelContainedInSpatialStructure", RelatingStructure=st, RelatedElements=cols)
+    for matdef, cols in by_material.values():
+        _root(f, "IfcRelAssociatesMaterial", RelatedObjects=cols, RelatingMaterial=matdef)
+    for ctype, cols in by_type.values():
+        _root(f, "IfcRelDefinesByType", RelatedObjects=cols, RelatingType=ctype)
+    if walls:
+        _root(f, "IfcRelAssociatesMaterial", RelatedObjects=walls, RelatingMaterial=brick)
+
+    f.write(path)
+    return path
+
+# ---------- Stage benchmark ----------
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024.0 * 1024.0) if sys.platform == "darwin" else rss / 1024.0
+
+class _Timer:
+    def __init__(self):
+        self.stages = {}
+
+    def __call__(self, name, fn, *args):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        self.stages[name] = time.perf_counter() - t0
+        return out
+
+def bench_model(path):
+    """Time each pipeline stage on one model; returns {stage: seconds, ...}."""
+    t = _Timer()
+    model = t("open", ifcopenshell.open, path)
+    to_m = t("units", cap.length_unit_scale_to_m, model)
+    index = t("spatial_index", cap.build_spatial_index, model)
+    columns = t("select_columns", cap.iter_model_columns, index)
+
+    mat_cache = cap.new_material_cache()
+    t("material", lambda: [cap.get_material_info_with_fc(c, mat_cache) for c in columns])
+
+    def profiles():
+        need = []
+        for c in columns:
+            prof = cap.get_material_profiledef(c) or cap.get_extruded_profiledef(c)
+            wh = cap.width_height_from_profile(prof, to_m) if prof else None
+            if not wh or max(wh) > cap.A_SANITY_EDGE_M:
+                need.append(c)
+        return need
+    need_bbox = t("profile", profiles)
+    t("geometry_fallback", cap.xy_bbox_batch, model, need_bbox)
+
+    extracts = t("extract_total", lambda: list(cap.iter_column_extracts(model, columns, to_m, index)))
+    results = t("capacity", lambda: cap.check_columns(extracts))
+
+    def report():
+        buf = io.StringIO()
+        w = cap.TextReportWriter(buf, path, cap.default_config(storey_match=None))
+        return cap.stream_results(results, [w])
+    t("report", report)
+
+    out = {"model": path, "columns": len(columns), "bbox_columns": len(need_bbox),
+           "material_cache": {"hits": mat_cache["hits"], "misses": mat_cache["misses"]},
+           "stages": t.stages, "peak_mb": _peak_rss_mb()}
+    return out
+
+# ---------- Pre-filter benchmark ----------
+def _load_columns(path):
+    """Worker: open `path` and extract every column; returns (seconds, peak MB, columns)."""
+    t0 = time.perf_counter()
+    model = ifcopenshell.open(path)
+    index = cap.build_spatial_index(model)
+    columns = cap.iter_model_columns(index)
+    n = sum(1 for _ in cap.iter_column_extracts(model, columns, cap.length_unit_scale_to_m(model), index))
+    return time.perf_counter() - t0, _peak_rss_mb(), n
+
+def _prefilter_then_load(path):
+    t0 = time.perf_counter()
+    st = prefilter_model(path, os.path.splitext(path)[0] + ".columns.ifc")
+    _, peak, n = _load_columns(st["dst"])
+    return time.perf_counter() - t0, peak, n
+
+def bench_prefilter(path):
+    """Full load vs pre-filter + subset load, each in a fresh process (so peak RSS is per variant)."""
+    out = {"model": path}
+    for name, fn in (("full", _load_columns), ("prefilter", _prefilter_then_load)):
+        with Pool(1, maxtasksperchild=1) as pool:
+            sec, peak, n = pool.apply(fn, (path,))
+        out[name] = {"seconds": sec, "peak_mb": peak, "columns": n}
+    return out
+
+# ---------- Startup latency ----------
+STARTUP_CASES = {
+    "import A3": [sys.executable, "-c", "import A3"],
+    "cli --help": [sys.executable, "-m", "A3", "--help"],
+}
+
+def bench_startup(repeats=5):
+    """Best-of-`repeats` wall time (s) of a fresh interpreter importing A3 / showing the CLI help."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = {}
+    for name, cmd in STARTUP_CASES.items():
+        best = None
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            subprocess.run(cmd, cwd=root, check=True, stdout=subprocess.DEVNULL)
+            dt = time.perf_counter() - t0
+            best = dt if best is None else min(best, dt)
+        out[name] = best
+    return out
+
+def _print_table(rows):
+    stages = list(rows[0]["stages"])
+    print(f"{'columns':>8} " + " ".join(f"{s[:12]:>12}" for s in stages) + f" {'peak MB':>8}")
+    for r in rows:
+        print(f"{r['columns']:>8} " + " ".join(f"{r['stages'][s]:>12.3f}" for s in stages)
+              + f" {r['peak_mb'] or 0:>8.0f}")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Synthetic-model benchmark of the A3 column capacity pipeline.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="column counts")
+    ap.add_argument("--storeys", type=int, default=10)
+    ap.add_argument("--out", default="bench_models", help="directory for generated models and results")
+    ap.add_argument("--generate-only", action="store_true")
+    ap.add_argument("--clutter", type=int, default=0, help="extra walls per column in generated models")
+    ap.add_argument("--prefilter", action="store_true", help="compare full load vs the column pre-filter")
+    ap.add_argument("--startup", action="store_true", help="only measure import / CLI cold-start time")
+    args = ap.parse_args(argv)
+
+    if args.startup:
+        for name, sec in bench_startup().items():
+            print(f"{name:<12} {sec*1000:8.1f} ms")
+        return
+
+    os.makedirs(args.out, exist_ok=True)
+    rows = []
+    for n in args.sizes:
+        suffix = f"_w{args.clutter}" if args.clutter else ""
+        path = os.path.join(args.out, f"synthetic_{n}x{args.storeys}{suffix}.ifc")
+        if not os.path.exists(path):
+            t0 = time.perf_counter()
+            make_model(path, n, args.storeys, args.clutter)
+            print(f"generated {path} in {time.perf_counter() - t0:.1f} s", flush=True)
+        if args.prefilter:
+            res = bench_prefilter(path)
+            for name in ("full", "prefilter"):
+                r = res[name]
+                print(f"{os.path.basename(path)} {name:<10} {r['seconds']:8.2f} s {r['peak_mb'] or 0:8.0f} MB "
+                      f"{r['columns']:>8} columns", flush=True)
+            rows.append(res)
+        elif not args.generate_only:
+            rows.append(bench_model(path))
+            print(f"benchmarked {path}", flush=True)
+
+    if rows and not args.prefilter:
+        _print_table(rows)
+    if rows:
+        name = "prefilter_results.json" if args.prefilter else "bench_results.json"
+        with open(os.path.join(args.out, name), "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+if __name__ == "__main__":
+    main()
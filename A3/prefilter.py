@@ -0,0 +1,233 @@
+"""
+STEP pre-filter: copy only the IfcColumn sub-graph of a (huge) IFC file (plus the slabs the
+load takedown needs) into a small IFC that the capacity check opens instead of the full model.
+
+    python -m A3.prefilter federated.ifc columns.ifc
+    python -m A3 columns.ifc --storey all
+
+The file is memory-mapped and scanned once, in NumPy chunks, into a compact id -> offset
+index (records are expected to start a line as "#id=TYPE(", as exporters write them). The kept
+set is the reference closure of the project (units, contexts), every column and every slab
+(for SLAB_LOAD tributary areas), plus the
+relationships that attach containment, types, materials and property sets to them; those
+relationships are rewritten to list only kept objects. Material / profile property
+entities that point at a kept material or profile are kept as well.
+"""
+import argparse
+import mmap
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+SCAN_CHUNK = 1 << 25  # bytes per NumPy scan step (bounds the temporary arrays)
+_ID_WIDTH = 12        # max digits of an entity id
+_MAX_PAD = 8          # max blanks between "=" and the type name ("#12= IFCCOLUMN(")
+_REF = re.compile(rb"#(\d+)")
+_REF_LIST = re.compile(rb"\((\s*#\d+(?:\s*,\s*#\d+)*\s*)\)")
+
+COLUMN_TYPES = {b"IFCCOLUMN", b"IFCCOLUMNSTANDARDCASE"}
+SEED_TYPES = {b"IFCPROJECT", b"IFCSLAB", b"IFCSLABSTANDARDCASE", b"IFCSLABELEMENTEDCASE"} | COLUMN_TYPES
+# Objectified relationships: one list of related objects (trimmed to kept ids) + the relating side
+RELATION_TYPES = {
+    b"IFCRELCONTAINEDINSPATIALSTRUCTURE", b"IFCRELAGGREGATES", b"IFCRELDEFINESBYTYPE",
+    b"IFCRELDEFINESBYPROPERTIES", b"IFCRELASSOCIATESMATERIAL",
+}
+# Entities that point at a material / profile from the outside (e.g. Pset_MaterialConcrete)
+ATTACHED_TYPES = {
+    b"IFCMATERIALPROPERTIES", b"IFCEXTENDEDMATERIALPROPERTIES", b"IFCMECHANICALCONCRETEMATERIALPROPERTIES",
+    b"IFCMECHANICALMATERIALPROPERTIES", b"IFCPROFILEPROPERTIES", b"IFCGENERALPROFILEPROPERTIES",
+}
+
+_WATCHED = [(kind, t) for kind, types in (("seed", SEED_TYPES), ("relation", RELATION_TYPES),
+                                           ("attached", ATTACHED_TYPES)) for t in sorted(types)]
+
+def _scan_chunk(arr, lo, hi):
+    """Record starts in [lo, hi): (offsets, ids, watched-type index or -1)."""
+    last = len(arr) - 1
+    p = np.flatnonzero(arr[lo - 1:hi - 1] == 10) + lo  # byte after a newline
+    p = p[arr[p] == 35]                                  # ... that is '#'
+    ids = np.zeros(len(p), dtype=np.int64)
+    ndig = np.zeros(len(p), dtype=np.int64)
+    active = np.ones(len(p), dtype=bool)
+    for k in range(_ID_WIDTH):  # one byte column at a time keeps temporaries O(records)
+        d = arr[np.minimum(p + 1 + k, last)].astype(np.int64) - 48
+        active &= (d >= 0) & (d <= 9)
+        ids = np.where(active, ids * 10 + d, ids)
+        ndig += active
+    eq = p + 1 + ndig
+    ok = (ndig > 0) & (arr[np.minimum(eq, last)] == 61)  # "#<digits>=" (skips wrapped "#12,#13" lines)
+    p, ids, name = p[ok], ids[ok], eq[ok] + 1
+    for _ in range(_MAX_PAD):  # skip the blanks some exporters write after "="
+        blank = (arr[np.minimum(name, last)] == 32) | (arr[np.minimum(name, last)] == 9)
+        if not blank.any():
+            break
+        name = name + blank
+    kind = np.full(len(p), -1, dtype=np.int16)
+    for i, (_, t) in enumerate(_WATCHED):
+        cand = np.arange(len(p))
+        for j, c in enumerate(t + b"("):
+            cand = cand[arr[np.minimum(name[cand] + j, last)] == c]
+        kind[cand] = i
+    return p, ids, kind
+
+class StepIndex:
+    """id -> byte range of every DATA record in a memory-mapped STEP file."""
+    def __init__(self, path):
+        self.f = open(path, "rb")
+        self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.data_start = self.mm.find(b"\nDATA;") + 1
+        self.data_end = self.mm.rfind(b"ENDSEC;")
+        arr = np.frombuffer(self.mm, dtype=np.uint8)
+        starts, ids, kinds = [], [], []
+        for lo in range(self.data_start, self.data_end, SCAN_CHUNK):
+            p, i, k = _scan_chunk(arr, lo, min(lo + SCAN_CHUNK, self.data_end))
+            starts.append(p); ids.append(i); kinds.append(k)
+        del arr  # the mmap can't close while a view on it exists
+        starts = np.concatenate(starts) if starts else np.zeros(0, dtype=np.int64)
+        ids = np.concatenate(ids) if ids else np.zeros(0, dtype=np.int64)
+        kinds = np.concatenate(kinds) if kinds else np.zeros(0, dtype=np.int16)
+        by_kind = {"seed": [], "relation": [], "attached": []}
+        for i, (kind, _) in enumerate(_WATCHED):
+            by_kind[kind].extend(ids[kinds == i].tolist())
+        self.seeds, self.relations, self.attached = by_kind["seed"], by_kind["relation"], by_kind["attached"]
+        self.n_columns = sum(int((kinds == i).sum()) for i, (_, t) in enumerate(_WATCHED) if t in COLUMN_TYPES)
+        order = np.argsort(ids, kind="stable")
+        self.ids = ids[order]
+        self.begin = starts[order]
+        self.end = np.append(starts[1:], self.data_end)[order]  # records run up to the next record
+
+    def __len__(self):
+        return len(self.ids)
+
+    def record(self, rid):
+        """Raw bytes of record #rid (None if the id is not defined)."""
+        i = np.searchsorted(self.ids, rid)
+        if i >= len(self.ids) or self.ids[i] != rid:
+            return None
+        return self.mm[self.begin[i]:self.end[i]].strip()
+
+    def close(self):
+        self.mm.close()
+        self.f.close()
+
+def _body(rec):
+    """The attribute part of a record (after '=' and the type name)."""
+    return rec[rec.index(b"(") :]
+
+def _refs(rec):
+    return [int(r) for r in _REF.findall(_body(rec))]
+
+def _forward_closure(idx, start, kept):
+    """Add everything reachable from `start` by forward references to `kept`."""
+    stack = [r for r in start if r not in kept]
+    kept.update(stack)
+    while stack:
+        rec = idx.record(stack.pop())
+        if rec is None:
+            continue
+        for r in _refs(rec):
+            if r not in kept:
+                kept.add(r)
+                stack.append(r)
+
+def _related_list(rec):
+    """(match, ids) of the relationship's list of related objects."""
+    m = _REF_LIST.search(_body(rec))
+    return m, [int(r) for r in _REF.findall(m.group(1))] if m else []
+
+def column_closure(idx):
+    """
+    Ids to keep, plus {relationship id: kept related ids} for relationships to rewrite.
+    Relationships are added until nothing new attaches (e.g. column -> type -> type material);
+    their related lists are trimmed to the final kept set.
+    """
+    kept = set()
+    _forward_closure(idx, idx.seeds, kept)
+    taken, pending = [], list(idx.relations)
+    attached = list(idx.attached)
+    while True:
+        grew = False
+        still = []
+        for rid in pending:
+            rec = idx.record(rid)
+            _, related = _related_list(rec)
+            if not any(r in kept for r in related):
+                still.append(rid)
+                continue
+            taken.append(rid)
+            kept.add(rid)
+            related = set(related)
+            _forward_closure(idx, [r for r in _refs(rec) if r not in related], kept)
+            grew = True
+        pending = still
+        rest = []
+        for rid in attached:
+            rec = idx.record(rid)
+            if any(r in kept for r in _refs(rec)):
+                _forward_closure(idx, [rid], kept)
+                grew = True
+            else:
+                rest.append(rid)
+        attached = rest
+        if not grew:
+            break
+    # members can become kept after their relationship was taken, so the lists are trimmed last
+    rels = {rid: [r for r in _related_list(idx.record(rid))[1] if r in kept] for rid in taken}
+    return kept, rels
+
+def _rewrite_relation(rec, keep):
+    """The relationship record with its related-objects list trimmed to `keep`."""
+    head = rec.index(b"(")
+    m, _ = _related_list(rec)
+    new_list = b"(" + b",".join(b"#%d" % r for r in keep) + b")"
+    return rec[:head + m.start()] + new_list + rec[head + m.end():]
+
+def prefilter_model(src, dst=None):
+    """Write the column sub-graph of `src` to `dst` (default <src>.columns.ifc); returns stats."""
+    dst = dst or os.path.splitext(src)[0] + ".columns.ifc"
+    t0 = time.perf_counter()
+    idx = StepIndex(src)
+    t1 = time.perf_counter()
+    try:
+        if not idx.n_columns:
+            raise ValueError(f"{src}: no IfcColumn records found (nothing to pre-filter)")
+        kept, rels = column_closure(idx)
+        t2 = time.perf_counter()
+        rows = np.flatnonzero(np.isin(idx.ids, np.fromiter(kept, dtype=np.int64, count=len(kept))))
+        rows = rows[np.argsort(idx.begin[rows])]  # original file order
+        with open(dst, "wb") as out:
+            out.write(idx.mm[:idx.data_start])
+            for i in rows:
+                rec = idx.mm[idx.begin[i]:idx.end[i]].strip()
+                rid = int(idx.ids[i])
+                if rid in rels:
+                    rec = _rewrite_relation(rec, rels[rid])
+                out.write(rec + b"\n")
+            out.write(b"ENDSEC;\nEND-ISO-10303-21;\n")
+        return {
+            "src": src, "dst": dst, "records": len(idx), "kept": len(rows),
+            "src_mb": os.path.getsize(src) / 1e6, "dst_mb": os.path.getsize(dst) / 1e6,
+            "index_s": t1 - t0, "closure_s": t2 - t1, "write_s": time.perf_counter() - t2,
+        }
+    finally:
+        idx.close()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Extract the IfcColumn sub-graph of a large IFC file.")
+    ap.add_argument("src", help="IFC (STEP) file")
+    ap.add_argument("dst", nargs="?", help="output IFC (default: <src>.columns.ifc)")
+    args = ap.parse_args(argv)
+    try:
+        st = prefilter_model(args.src, args.dst)
+    except ValueError as e:
+        sys.exit(f"error: {e}")
+    print(f"{st['dst']}: kept {st['kept']} of {st['records']} records, "
+          f"{st['src_mb']:.1f} MB -> {st['dst_mb']:.1f} MB "
+          f"(index {st['index_s']:.2f} s, closure {st['closure_s']:.2f} s, write {st['write_s']:.2f} s)",
+          file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
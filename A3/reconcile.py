@@ -0,0 +1,163 @@
+"""
+Cross-model column reconciliation, e.g. structural vs. architectural model.
+
+    python -m A3.reconcile 25-16-D-STR.ifc 25-16-D-ARK.ifc --report Column.reconciliation.txt
+
+Columns are matched by GlobalId first. The rest are matched by position: a 3D spatial hash
+with cells of the XY / elevation tolerance, so each column only looks at its 27 neighbouring
+cells. The report lists columns missing from the first model, extra columns in it, moved
+columns and cross-section mismatches (profile dimensions, in mm).
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import ifcopenshell
+
+from .A3 import (absolute_positions, build_spatial_index, get_extruded_profiledef, get_material_profiledef,
+                 iter_model_columns, length_unit_scale_to_m, width_height_from_profile)
+
+TOL_XY_M = 0.10   # max plan offset for a positional match
+TOL_Z_M = 0.50    # max base elevation offset for a positional match
+DIM_TOL_MM = 5.0  # cross-section edges differing more than this are a mismatch
+
+def column_records(model):
+    """Columns of an opened model as arrays: gid, storey, xyz (m), dims (mm, larger edge first; NaN = unknown)."""
+    to_m = length_unit_scale_to_m(model)
+    index = build_spatial_index(model)
+    columns = iter_model_columns(index)
+    dims = np.full((len(columns), 2), np.nan)
+    for i, col in enumerate(columns):
+        prof = get_material_profiledef(col)
+        wh = width_height_from_profile(prof, to_m) if prof else None
+        if not wh:
+            prof = get_extruded_profiledef(col)
+            wh = width_height_from_profile(prof, to_m) if prof else None
+        if wh:
+            dims[i] = sorted(wh, reverse=True)
+    return {
+        "gid": [c.GlobalId for c in columns],
+        "storey": [getattr(index["storey_of"].get(c.id()), "Name", None) or "<no storey>" for c in columns],
+        "xyz": absolute_positions(columns, to_m),
+        "dims": dims * 1000.0,
+    }
+
+def _cell_keys(xyz, tol_xy, tol_z):
+    return np.floor(xyz / np.array([tol_xy, tol_xy, tol_z])).astype(np.int64)
+
+def match_by_position(a_xyz, b_xyz, tol_xy=TOL_XY_M, tol_z=TOL_Z_M):
+    """
+    [(i, j)] pairs of a-rows / b-rows within the tolerances, each row used once (closest pairs
+    first). b is hashed into cells of the tolerance size; a looks up its 27 neighbouring cells.
+    """
+    if not len(a_xyz) or not len(b_xyz):
+        return []
+    cells = {}
+    for j, key in enumerate(map(tuple, _cell_keys(b_xyz, tol_xy, tol_z).tolist())):
+        cells.setdefault(key, []).append(j)
+    offsets = [(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)]
+    cand = []
+    for i, (cx, cy, cz) in enumerate(_cell_keys(a_xyz, tol_xy, tol_z).tolist()):
+        for dx, dy, dz in offsets:
+            for j in cells.get((cx + dx, cy + dy, cz + dz), ()):
+                d = a_xyz[i] - b_xyz[j]
+                dxy = float(np.hypot(d[0], d[1]))
+                if dxy <= tol_xy and abs(d[2]) <= tol_z:
+                    cand.append((dxy + abs(d[2]), i, j))
+    cand.sort()
+    used_a, used_b, pairs = set(), set(), []
+    for _, i, j in cand:
+        if i not in used_a and j not in used_b:
+            used_a.add(i)
+            used_b.add(j)
+            pairs.append((i, j))
+    return pairs
+
+def reconcile(a, b, tol_xy=TOL_XY_M, tol_z=TOL_Z_M, dim_tol_mm=DIM_TOL_MM):
+    """
+    Compare two column_records(). Returns a dict with
+      - "matched":  [(i, j, how)] how = "gid" / "position"
+      - "missing":  b-rows with no counterpart in a
+      - "extra":    a-rows with no counterpart in b
+      - "moved":    [(i, j, offset m)] GlobalId matches further apart than the tolerances
+      - "mismatch": [(i, j)] matches whose cross-section differs by more than dim_tol_mm,
+                    or is known in only one of the models
+    """
+    b_row = {gid: j for j, gid in enumerate(b["gid"])}
+    matched = [(i, b_row[gid], "gid") for i, gid in enumerate(a["gid"]) if gid in b_row]
+    a_left = np.array(sorted(set(range(len(a["gid"]))) - {i for i, _, _ in matched}), dtype=np.int64)
+    b_left = np.array(sorted(set(range(len(b["gid"]))) - {j for _, j, _ in matched}), dtype=np.int64)
+    pos = match_by_position(a["xyz"][a_left], b["xyz"][b_left], tol_xy, tol_z)
+    matched += [(int(a_left[i]), int(b_left[j]), "position") for i, j in pos]
+
+    ia = np.array([i for i, _, _ in matched], dtype=np.int64)
+    jb = np.array([j for _, j, _ in matched], dtype=np.int64)
+    d = a["xyz"][ia] - b["xyz"][jb]
+    far = (np.hypot(d[:, 0], d[:, 1]) > tol_xy) | (np.abs(d[:, 2]) > tol_z)
+    da, db = a["dims"][ia], b["dims"][jb]
+    with np.errstate(invalid="ignore"):
+        # a section known in one model but not the other is a mismatch too
+        differ = ((np.abs(da - db) > dim_tol_mm) | (np.isnan(da) != np.isnan(db))).any(axis=1)
+    return {
+        "matched": matched,
+        "missing": sorted(set(range(len(b["gid"]))) - set(jb.tolist())),
+        "extra": sorted(set(range(len(a["gid"]))) - set(ia.tolist())),
+        "moved": [(int(ia[k]), int(jb[k]), float(np.linalg.norm(d[k]))) for k in np.flatnonzero(far)],
+        "mismatch": [(int(ia[k]), int(jb[k])) for k in np.flatnonzero(differ)],
+    }
+
+def _dims_txt(dims):
+    return "<unknown>" if np.isnan(dims).any() else f"{dims[0]:.0f} × {dims[1]:.0f} mm"
+
+def _where(rec, i):
+    x, y, z = rec["xyz"][i]
+    return f"{rec['storey'][i]} @ ({x:.2f}, {y:.2f}, {z:.2f}) m"
+
+def write_reconciliation_report(res, a, b, a_path, b_path, f):
+    """Text report of reconcile() results."""
+    n_pos = sum(1 for _, _, how in res["matched"] if how == "position")
+    print("COLUMN RECONCILIATION REPORT", file=f)
+    print(f"Model:      {a_path} ({len(a['gid'])} columns)", file=f)
+    print(f"Compared:   {b_path} ({len(b['gid'])} columns)", file=f)
+    print(f"Matched: {len(res['matched'])} ({len(res['matched']) - n_pos} by GlobalId, {n_pos} by position) | "
+          f"missing: {len(res['missing'])} | extra: {len(res['extra'])} | moved: {len(res['moved'])} | "
+          f"dimension mismatch: {len(res['mismatch'])}", file=f)
+    print("-"*80, file=f)
+    for i, j in res["mismatch"]:
+        gid = a["gid"][i] if a["gid"][i] == b["gid"][j] else f"{a['gid'][i]} / {b['gid'][j]}"
+        print(f"≠ {gid}: {_dims_txt(a['dims'][i])} vs {_dims_txt(b['dims'][j])} | {_where(a, i)}", file=f)
+    for i, j, dist in res["moved"]:
+        print(f"→ {a['gid'][i]}: moved {dist:.2f} m | {_where(a, i)} vs {_where(b, j)}", file=f)
+    for j in res["missing"]:
+        print(f"- {b['gid'][j]}: only in compared model | {_dims_txt(b['dims'][j])} | {_where(b, j)}", file=f)
+    for i in res["extra"]:
+        print(f"+ {a['gid'][i]}: only in this model | {_dims_txt(a['dims'][i])} | {_where(a, i)}", file=f)
+    print("End of report.", file=f)
+
+def run_reconciliation(model_path, other_path, report_path, tol_xy=TOL_XY_M, tol_z=TOL_Z_M, dim_tol_mm=DIM_TOL_MM):
+    """Open both models, reconcile their columns and write the report; returns the reconcile() dict."""
+    a = column_records(ifcopenshell.open(model_path))
+    b = column_records(ifcopenshell.open(other_path))
+    res = reconcile(a, b, tol_xy, tol_z, dim_tol_mm)
+    with open(report_path, "w", encoding="utf-8") as f:
+        write_reconciliation_report(res, a, b, model_path, other_path, f)
+    return res
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Match the columns of two IFC models and report the differences.")
+    ap.add_argument("model", help="model whose columns are checked (e.g. the structural model)")
+    ap.add_argument("other", help="model to compare with (e.g. the architectural model)")
+    ap.add_argument("--report", default="Column.reconciliation.txt", help="text report path")
+    ap.add_argument("--tol-xy", type=float, default=TOL_XY_M, help="plan tolerance for positional matches [m]")
+    ap.add_argument("--tol-z", type=float, default=TOL_Z_M, help="elevation tolerance for positional matches [m]")
+    ap.add_argument("--dim-tol", type=float, default=DIM_TOL_MM, help="cross-section tolerance [mm]")
+    args = ap.parse_args(argv)
+    t0 = time.perf_counter()
+    res = run_reconciliation(args.model, args.other, args.report, args.tol_xy, args.tol_z, args.dim_tol)
+    print(f"{len(res['matched'])} matched | missing {len(res['missing'])} | extra {len(res['extra'])} | "
+          f"moved {len(res['moved'])} | dimension mismatch {len(res['mismatch'])} → {args.report} "
+          f"({time.perf_counter() - t0:.1f} s)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Local check service: keeps parsed models (plus spatial index and extracted columns) in
+memory so repeated capacity / rule queries don't re-parse the IFC file.
+
+    python -m A3.service --port 8765 --budget-mb 4096 --preload model.ifc
+
+    GET  /capacity?model=model.ifc&storey=Level%20-1&Ned=900&gamma=1.5&fc_default=30[&slab_load=10][&stacks=1][&buckling=0][&columns=1]
+    GET  /rules?model=model.ifc&rule=doorRule&rule=windowRule
+    GET  /models                      cached models with memory estimate and hit counts
+    POST /evict?model=model.ifc       drop one model (no model: drop all)
+
+Models are evicted least-recently-used first once the memory budget is exceeded, and
+reloaded when the file's size/mtime changes and its content hash no longer matches.
+Binds to 127.0.0.1 by default: it opens any path a client names.
+"""
+import argparse
+import gc
+import importlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import ifcopenshell
+
+from .A3 import (_plain, build_spatial_index, check_columns, default_config, iter_column_extracts,
+                 iter_model_columns, length_unit_scale_to_m, model_file_hash, new_material_cache,
+                 storey_view, summarize_results, load_takedown, with_load_takedown)
+
+BUDGET_MB = 4096          # memory budget for cached models
+MODEL_MEMORY_FACTOR = 10  # in-memory size ≈ factor × file size, when RSS can't be measured
+
+def _rss_mb():
+    """Current resident memory of this process in MB (None if unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024.0 * 1024.0)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def _stat_key(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+# ---------- Model cache ----------
+class ModelCache:
+    """LRU of parsed models keyed by absolute path, bounded by an estimated memory budget."""
+    def __init__(self, budget_mb=BUDGET_MB):
+        self.budget_mb = budget_mb
+        self.entries = OrderedDict()  # path -> entry dict, least recently used first
+        self.lock = threading.Lock()  # guards `entries` and `loading`; never held while parsing
+        self.loading = {}  # path -> lock held while that model is parsed (one load per path)
+        self.loads = self.hits = self.evictions = 0
+
+    def _load(self, path, stat):
+        rss0 = _rss_mb()
+        t0 = time.perf_counter()
+        model = ifcopenshell.open(path)
+        index = build_spatial_index(model)
+        entry = {
+            "path": path, "stat": stat, "sha256": model_file_hash(path),
+            "model": model, "to_m": length_unit_scale_to_m(model), "index": index,
+            "extracts": None, "context": None, "lock": threading.Lock(),
+            "load_s": time.perf_counter() - t0, "hits": 0,
+        }
+        rss1 = _rss_mb()
+        if rss0 is not None and rss1 is not None and rss1 > rss0:
+            entry["mem_mb"] = rss1 - rss0
+        else:  # freed memory gets reused, so a zero delta says nothing
+            entry["mem_mb"] = stat[0] * MODEL_MEMORY_FACTOR / (1024.0 * 1024.0)
+        return entry
+
+    def _evict_over_budget(self):
+        total = sum(e["mem_mb"] for e in self.entries.values())
+        while total > self.budget_mb and len(self.entries) > 1:
+            _, old = self.entries.popitem(last=False)
+            total -= old["mem_mb"]
+            self.evictions += 1
+        gc.collect()
+
+    def _cached(self, path, stat):
+        """Entry for `path` if it is still current (caller holds self.lock), counted as a hit."""
+        entry = self.entries.get(path)
+        if entry is not None and entry["stat"] != stat:
+            # touched or rewritten: keep the parsed model only if the content is identical
+            if model_file_hash(path) == entry["sha256"]:
+                entry["stat"] = stat
+            else:
+                del self.entries[path]
+                entry = None
+        if entry is not None:
+            entry["hits"] += 1
+            self.hits += 1
+            self.entries.move_to_end(path)
+        return entry
+
+    def get(self, path):
+        """
+        Cached entry for `path`; (re)loads when missing or the file content changed.
+        Parsing holds only that path's lock, so queries on other (cached) models are not held
+        up by it, and concurrent requests for the same model wait for the one load.
+        """
+        path = os.path.abspath(path)
+        stat = _stat_key(path)
+        with self.lock:
+            entry = self._cached(path, stat)
+            if entry is not None:
+                return entry
+            loading = self.loading.setdefault(path, threading.Lock())
+        with loading:
+            with self.lock:
+                entry = self._cached(path, stat)  # loaded by another request while we waited
+                if entry is not None:
+                    return entry
+            try:
+                entry = self._load(path, stat)
+            except BaseException:
+                with self.lock:
+                    self.loading.pop(path, None)
+                raise
+            with self.lock:
+                self.entries[path] = entry
+                self.loading.pop(path, None)
+                self.loads += 1
+                self._evict_over_budget()
+            return entry
+
+    def evict(self, path=None):
+        with self.lock:
+            if path is None:
+                n = len(self.entries)
+                self.entries.clear()
+            else:
+                n = 1 if self.entries.pop(os.path.abspath(path), None) is not None else 0
+            self.evictions += n
+        gc.collect()
+        return n
+
+    def status(self):
+        with self.lock:
+            models = [{"model": e["path"], "mem_mb": round(e["mem_mb"], 1), "load_s": round(e["load_s"], 3),
+                       "hits": e["hits"], "columns_extracted": e["extracts"] is not None}
+                      for e in self.entries.values()]
+        return {"budget_mb": self.budget_mb, "used_mb": round(sum(m["mem_mb"] for m in models), 1),
+                "loads": self.loads, "hits": self.hits, "evictions": self.evictions, "models": models}
+
+def _extracts(entry):
+    """Every storey-contained column of the model, extracted once per cached model."""
+    with entry["lock"]:
+        if entry["extracts"] is None:
+            model, index, to_m = entry["model"], entry["index"], entry["to_m"]
+            columns = iter_model_columns(index)
+            takedown = load_takedown(model, columns, index, to_m)
+            entry["extracts"] = list(with_load_takedown(iter_column_extracts(model, columns, to_m, index,
+                                                                             new_material_cache()), takedown))
+        return entry["extracts"]
+
+def _rule_context(entry, rules):
+    """The entry's shared rule context, extended with whatever `rules` declare that it lacks."""
+    from rules.engine import build_context
+    if entry["context"] is None:
+        # seed with what the capacity queries already hold, so nothing is parsed twice
+        entry["context"] = {"model": entry["model"], "entities": {}, "timings": {},
+                            "index": entry["index"], "to_m": entry["to_m"]}
+    if entry["extracts"] is not None and "columns" not in entry["context"]:
+        # the capacity extracts already carry the load takedown, which the inventory ignores
+        entry["context"]["columns"] = {"columns": iter_model_columns(entry["index"]), "extracts": entry["extracts"]}
+        entry["context"]["column_loads"] = entry["extracts"]
+    return build_context(entry["model"], rules, into=entry["context"])
+
+# ---------- Queries ----------
+def _arg(q, name, cast=str, default=None):
+    v = q.get(name)
+    return cast(v[0]) if v else default
+
+def query_capacity(cache, q):
+    """Capacity check of one cached model with the query's storey / Ned / gamma / fc_default."""
+    t0 = time.perf_counter()
+    entry = cache.get(_arg(q, "model"))
+    storey = _arg(q, "storey")
+    cfg = default_config()
+    cfg = cfg._replace(
+        storey_match=None if storey is None or storey.lower() == "all" else storey,
+        Ned=_arg(q, "Ned", float, cfg.Ned),
+        gamma_mo=_arg(q, "gamma", float, cfg.gamma_mo),
+        fc_default=_arg(q, "fc_default", float, cfg.fc_default),
+        slab_load=_arg(q, "slab_load", float, cfg.slab_load),
+        stack_loads=bool(_arg(q, "stacks", int, int(cfg.stack_loads))),
+        buckling=bool(_arg(q, "buckling", int, int(cfg.buckling))),
+    )
+    results = check_columns(storey_view(_extracts(entry), cfg.storey_match), cfg)
+    summ = summarize_results(results)
+    worst = summ["worst"]
+    out = {
+        "model": entry["path"], "storey": cfg.storey_match, "Ned": cfg.Ned, "gamma_mo": cfg.gamma_mo,
+        "fc_default": cfg.fc_default, "slab_load": cfg.slab_load, "slab_carried": summ["slab_carried"],
+        "stack_loads": cfg.stack_loads, "buckling": cfg.buckling, "checked": summ["ok"] + summ["nok"], "ok": summ["ok"],
+        "nok": summ["nok"], "unknown": summ["unknown"],
+        "worst_util": _plain(worst.util) if worst else None, "worst_gid": worst.gid if worst else None,
+    }
+    if _arg(q, "columns", int, 0):
+        out["columns"] = [{k: _plain(v) for k, v in r._asdict().items()} for r in results]
+    out["ms"] = (time.perf_counter() - t0) * 1000.0
+    return out
+
+def query_rules(cache, q):
+    """Run the named rules/ modules (checkRule) on one cached model with a shared context."""
+    from rules.engine import run_rules
+    t0 = time.perf_counter()
+    entry = cache.get(_arg(q, "model"))
+    rules = [importlib.import_module(f"rules.{name}") for name in q.get("rule", [])]
+    with entry["lock"]:  # ifcopenshell models aren't safe for concurrent traversal
+        ctx = _rule_context(entry, rules)
+        results, _ = run_rules(entry["model"], rules, context=ctx)
+    return {"model": entry["path"], "ms": (time.perf_counter() - t0) * 1000.0,
+            "rules": [{"rule": name, "result": result, "ms": sec * 1000.0} for name, result, sec in results]}
+
+# ---------- HTTP ----------
+class _Handler(BaseHTTPRequestHandler):
+    cache = None  # set by make_server()
+
+    def _send(self, code, obj):
+        body = json.dumps(obj).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _dispatch(self, routes):
+        url = urlparse(self.path)
+        q = parse_qs(url.query)
+        fn = routes.get(url.path)
+        if fn is None:
+            return self._send(404, {"error": f"unknown endpoint {url.path}"})
+        if url.path in ("/capacity", "/rules") and not q.get("model"):
+            return self._send(400, {"error": "missing ?model=<path to .ifc>"})
+        try:
+            self._send(200, fn(q))
+        except FileNotFoundError as e:
+            self._send(404, {"error": str(e)})
+        except (ValueError, ImportError) as e:
+            self._send(400, {"error": f"{type(e).__name__}: {e}"})
+        except Exception as e:
+            self._send(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def do_GET(self):
+        self._dispatch({
+            "/capacity": lambda q: query_capacity(self.cache, q),
+            "/rules": lambda q: query_rules(self.cache, q),
+            "/models": lambda q: self.cache.status(),
+        })
+
+    def do_POST(self):
+        self._dispatch({"/evict": lambda q: {"evicted": self.cache.evict(_arg(q, "model"))}})
+
+    def log_message(self, fmt, *args):
+        pass  # quiet: every response carries its own timing
+
+def make_server(host="127.0.0.1", port=8765, budget_mb=BUDGET_MB):
+    handler = type("Handler", (_Handler,), {"cache": ModelCache(budget_mb)})
+    return ThreadingHTTPServer((host, port), handler)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Local capacity/rule check service with an in-memory model cache.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--budget-mb", type=float, default=BUDGET_MB, help="memory budget for cached models")
+    ap.add_argument("--preload", nargs="*", default=[], help="models to parse before serving")
+    args = ap.parse_args(argv)
+
+    server = make_server(args.host, args.port, args.budget_mb)
+    for path in args.preload:
+        entry = server.RequestHandlerClass.cache.get(path)
+        _extracts(entry)
+        print(f"loaded {entry['path']} in {entry['load_s']:.1f} s (~{entry['mem_mb']:.0f} MB)", flush=True)
+    print(f"serving on http://{args.host}:{args.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,17 @@ import ifcopenshell
 
 from rules import windowRule
 from rules import doorRule
+from rules import capacityRule
+from rules import Assignment_1
+from rules.engine import run_rules
 
 model = ifcopenshell.open("path/to/ifcfile.ifc")
 
-windowResult = windowRule.checkRule(model)
-doorResult = doorRule.checkRule(model)
+# The model is opened once; the engine builds one shared context for all rules.
+# Rules run one after another: ifcopenshell models aren't safe for concurrent traversal.
+results, context = run_rules(model, [windowRule, doorRule, capacityRule, Assignment_1])
 
-print("Window result:", windowResult)
-print("Door result:", doorResult)
+for name, result, seconds in results:
+    print(f"{name} result ({seconds*1000:.1f} ms):", result)
+for part, seconds in context["timings"].items():
+    print(f"context {part}: {seconds*1000:.1f} ms")
@@ -1,55 +1,51 @@
-import ifcopenshell as ifc
-from collections import Counter
-
-
-model=ifc.open("25-16-D-STR.ifc")
+import os
+import sys
 
-# Lists up attributes for all columns in ifc file
-columns = model.by_type('IfcColumn')
-
-# Making a list of info for all columns
-columns_info = [col.get_info() for col in columns][0]
+import ifcopenshell as ifc
 
-#Prints the whole list
-print(columns_info)
+if __package__ in (None, ""):  # run as a script (python rules/Assignment_1.py): make A3 / rules importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Lists up names for all columns in ifc file
-names = [col.Name for col in columns]
-#print(names)
+from A3.A3 import column_inventory, inventory_group
+from rules.engine import context_for
 
-# Concrete columns
-# Print out concrete columns name
-concrete_columns = [col for col in columns if col.Name and "Concrete" in col.Name]
-#print("\nName all Concrete-columns:")
-#for col in concrete_columns:
-#    print("-", col.Name)
+ENTITY_TYPES = ['IfcColumn']
+RELATIONS = ['columns']
 
-# Number of Concrete-columns
-print("\nNumber of Concrete-columns:", len(concrete_columns))
+def column_statistics(inv):
+    """Counts of concrete / wood columns per dimension and of all columns per storey (text)."""
+    lines = []
+    for material, title in (("Concrete", "Concrete"), ("Wood", "wood")):
+        per_dimension = inventory_group(inv, "dimension", where={"material": material})
+        lines.append(f"Number of {title}-columns: {sum(per_dimension.values())}")
+        lines.append(f"Number of {material.lower()} columns per dimension:")
+        for dimension, count in per_dimension.items():
+            lines.append(f"{dimension}: {count}")
 
-# Get dimensions from the name (last part after colon ":")
-dimensions = [col.Name.split(":")[-1].strip() for col in concrete_columns]
+    lines.append("Number of columns per storey:")
+    for storey, count in inventory_group(inv, "storey").items():
+        lines.append(f"{storey}: {count}")
 
-# Count how many of each dimension
-dimension_counts = Counter(dimensions)
+    lines.append("Cross-section area per material:")
+    for material, area in inventory_group(inv, "material", area=True).items():
+        lines.append(f"{material}: {area:.3f} m²")
+    return "\n".join(lines)
 
-# Print result
-print("Number of concrete columns per dimension:\n")
-for dimension, count in dimension_counts.items():
-    print(f"{dimension}: {count}")
+def checkRule(model, context=None):
+    ctx = context_for(model, context, ENTITY_TYPES, RELATIONS)
+    cols = ctx["columns"]
+    inv = column_inventory(model, cols["columns"], ctx["to_m"], ctx["index"], extracts=cols["extracts"])
+    return column_statistics(inv)
 
-# Wood columns
-# Number of wood-columns
-wood_columns = [col for col in columns if col.Name and "Wood" in col.Name]
-print("\nNumber of wood-columns:", len(wood_columns))
+if __name__ == "__main__":
+    model=ifc.open("25-16-D-STR.ifc")
 
-# Get dimensions from the name (last part after colon ":")
-dimensions = [col.Name.split(":")[-1].strip() for col in wood_columns]
+    # Lists up attributes for all columns in ifc file
+    columns = model.by_type('IfcColumn')
 
-# Count how many of each dimension
-dimension_counts = Counter(dimensions)
+    # Info for the first column
+    if columns:
+        print(columns[0].get_info())
 
-# Print result
-print("Number of wood columns per dimension:\n")
-for dimension, count in dimension_counts.items():
-    print(f"{dimension}: {count}")
+    print()
+    print(checkRule(model))
@@ -0,0 +1 @@
+"""Model checking rules (checkRule modules) and the shared-context engine that runs them."""
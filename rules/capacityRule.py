@@ -0,0 +1,19 @@
+import ifcopenshell
+
+from A3.A3 import STOREY_MATCH, check_columns, default_config, storey_view, summarize_results
+from rules.engine import context_for
+
+ENTITY_TYPES = ['IfcColumn']
+RELATIONS = ['column_loads']
+
+def checkRule(model, context=None, storey_match=STOREY_MATCH):
+    """Column capacity check (A3) on the shared context; returns a one-line summary."""
+    ctx = context_for(model, context, ENTITY_TYPES, RELATIONS)
+    # shared extracts with the same load takedown as the CLI / service
+    extracts = ctx["column_loads"]
+    summ = summarize_results(check_columns(storey_view(extracts, storey_match), default_config(storey_match=storey_match)))
+
+    result = f"Columns checked: {summ['ok'] + summ['nok']} | OK: {summ['ok']} | Maybe insufficient: {summ['nok']}"
+    if summ["worst"] is not None:
+        result += f" | worst utilization {summ['worst'].util:.2f}% ({summ['worst'].gid})"
+    return result
@@ -1,10 +1,44 @@
 import ifcopenshell
+from collections import Counter
 
-def checkRule(model):
-    doors = model.by_type('IfcDoor')
+from rules.engine import context_for
+from rules.properties import fire_rating_minutes, quantity, select
+
+ENTITY_TYPES = ['IfcDoor']
+RELATIONS = ['spatial', 'properties']
+
+PSET = "Pset_DoorCommon"
+FIRE_RATING_MIN = 30  # minutes: external doors below EI30 are reported
+
+def checkRule(model, context=None):
+    ctx = context_for(model, context, ENTITY_TYPES, RELATIONS)
+    doors = ctx["entities"]['IfcDoor']
 
     result = f"Doors: {len(doors)}"
 
-    return result
+    # Per-storey breakdown from the shared spatial index (see A3.build_spatial_index)
+    if doors:
+        per_storey = Counter(
+            getattr(ctx["index"]["storey_of"].get(d.id()), "Name", None) or "<no storey>" for d in doors
+        )
+        result += " (" + ", ".join(f"{name}: {n}" for name, n in per_storey.items()) + ")"
+    else:
+        return result
+
+    # Property checks are lookups in the shared property index (rules.properties)
+    props = ctx["props"]
+    ids = [d.id() for d in doors]
+    external = select(props, "IsExternal", pset=PSET, among=ids)
+    rated = select(props, "FireRating", pset=PSET, among=external,
+                   test=lambda v: (fire_rating_minutes(v) or 0) >= FIRE_RATING_MIN)
+    low_fire = [model.by_id(i).GlobalId for i in sorted(external - rated)]
+    acoustic = select(props, "AcousticRating", pset=PSET, among=ids)
+    widths = quantity(props, "Width", "Qto_DoorBaseQuantities", ids)
 
-#hello elisa
+    result += f" | external: {len(external)}, below EI{FIRE_RATING_MIN} or unrated: {len(low_fire)}"
+    if low_fire:
+        result += " (" + ", ".join(low_fire[:5]) + (", ..." if len(low_fire) > 5 else "") + ")"
+    result += f" | acoustic rating: {len(acoustic)} of {len(ids)}"
+    if widths:
+        result += f" | width {min(widths.values()):.2f}-{max(widths.values()):.2f} m (Qto)"
+    return result
@@ -0,0 +1,105 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import ifcopenshell
+
+from A3.A3 import (build_spatial_index, iter_column_extracts, iter_model_columns, length_unit_scale_to_m,
+                   load_takedown, with_load_takedown)
+from rules.properties import build_property_index
+
+def build_column_extracts(ctx):
+    """Storey-assigned columns and their extracts, shared by the column rules (no load takedown)."""
+    model, index, to_m = ctx["model"], ctx["index"], ctx["to_m"]
+    columns = iter_model_columns(index)
+    return {"columns": columns, "extracts": list(iter_column_extracts(model, columns, to_m, index))}
+
+def build_column_loads(ctx):
+    """The shared extracts with their load takedown (tributary slab areas, stacks) applied."""
+    model, index, to_m = ctx["model"], ctx["index"], ctx["to_m"]
+    cols = ctx["columns"]
+    return list(with_load_takedown(cols["extracts"], load_takedown(model, cols["columns"], index, to_m)))
+
+# Shared, lazily built pieces of context a rule can ask for in RELATIONS
+RELATION_BUILDERS = {
+    "spatial": ("index", build_spatial_index),   # element -> storey (A3.build_spatial_index)
+    "units": ("to_m", length_unit_scale_to_m),   # model length unit -> metres
+    "properties": ("props", build_property_index),  # (pset, property) -> {element id: value}
+    "columns": ("columns", build_column_extracts),  # {"columns": [...], "extracts": [ColumnExtract]}
+    "column_loads": ("column_loads", build_column_loads),  # [ColumnExtract] with trib_m2 / stack_* filled in
+}
+# Relations built from other relations: their builder gets the context instead of the model
+RELATION_REQUIRES = {"columns": ("spatial", "units"), "column_loads": ("columns",)}
+
+def _with_requirements(rels):
+    """`rels` plus everything they need, in build order (requirements first)."""
+    order = []
+    def add(rel):
+        if rel not in order:
+            for req in RELATION_REQUIRES.get(rel, ()):
+                add(req)
+            order.append(rel)
+    for rel in sorted(rels):
+        add(rel)
+    return order
+
+def build_context(model, rules=(), entity_types=(), relations=(), into=None):
+    """
+    One pass over the model for everything the rules declare:
+      - rule.ENTITY_TYPES -> context["entities"][type] (one by_type per type)
+      - rule.RELATIONS    -> context["index"] / context["to_m"] / context["props"] / context["columns"] /
+                             context["column_loads"] (see RELATION_BUILDERS)
+    `into` extends an existing context with only the pieces it lacks.
+    """
+    types = set(entity_types)
+    rels = set(relations)
+    for rule in rules:
+        types.update(getattr(rule, "ENTITY_TYPES", []))
+        rels.update(getattr(rule, "RELATIONS", []))
+
+    ctx = into if into is not None else {"model": model, "entities": {}, "timings": {}}
+    t0 = time.perf_counter()
+    for t in sorted(types - set(ctx["entities"])):
+        ctx["entities"][t] = model.by_type(t)
+    ctx["timings"]["entities"] = ctx["timings"].get("entities", 0.0) + time.perf_counter() - t0
+    for rel in _with_requirements(rels):
+        key, builder = RELATION_BUILDERS[rel]
+        if key in ctx:
+            continue
+        t0 = time.perf_counter()
+        ctx[key] = builder(ctx) if rel in RELATION_REQUIRES else builder(model)
+        ctx["timings"][rel] = time.perf_counter() - t0
+    return ctx
+
+def context_for(model, context, entity_types=(), relations=()):
+    """The engine's shared context, or a private one when a rule is called on its own."""
+    if context is not None:
+        return context
+    return build_context(model, entity_types=entity_types, relations=relations)
+
+def rule_name(rule):
+    return rule.__name__.split(".")[-1]
+
+def run_rules(model, rules, threads=None, context=None):
+    """
+    Build the shared context once and dispatch every rule's checkRule(model, context).
+    Rules run one after another by default; threads > 1 runs them on a thread pool, which is
+    only safe for rules that read nothing but the prebuilt context (ifcopenshell models aren't
+    safe for concurrent traversal, see A3.service). Returns ([(name, result, seconds)], context).
+    """
+    ctx = context if context is not None else build_context(model, rules)
+
+    def run(rule):
+        t0 = time.perf_counter()
+        result = rule.checkRule(model, ctx)
+        return rule_name(rule), result, time.perf_counter() - t0
+
+    if threads and threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as ex:
+            out = list(ex.map(run, rules))
+    else:
+        out = [run(rule) for rule in rules]
+    return out, ctx
+
+def run_rules_on_file(path, rules, threads=None):
+    """Open the model once and run all rules on it."""
+    return run_rules(ifcopenshell.open(path), rules, threads)
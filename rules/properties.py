@@ -0,0 +1,116 @@
+import re
+from collections import defaultdict
+
+from A3.A3 import property_definitions, quantity_scaler
+
+# Property-set index shared by the rules (context["props"], see rules.engine.RELATION_BUILDERS)
+
+def _value(prop, to_si):
+    """Plain Python value of an IfcProperty / IfcPhysicalQuantity (None if it has none); quantities in SI."""
+    if prop.is_a("IfcPropertySingleValue"):
+        v = prop.NominalValue
+        return v.wrappedValue if v is not None else None
+    if prop.is_a("IfcPropertyEnumeratedValue"):
+        vals = [v.wrappedValue for v in (prop.EnumerationValues or [])]
+        return vals[0] if len(vals) == 1 else tuple(vals) or None
+    if prop.is_a("IfcPropertyListValue"):
+        return tuple(v.wrappedValue for v in (prop.ListValues or [])) or None
+    if prop.is_a("IfcPhysicalSimpleQuantity"):
+        v = prop[3]  # LengthValue / AreaValue / VolumeValue / CountValue / WeightValue / TimeValue
+        return v * to_si(prop) if isinstance(v, (int, float)) else v
+    return None
+
+def _pset_items(pset, memo, to_si):
+    """[(pset name, property name, value)] of a property set or element quantity, read once per pset."""
+    items = memo.get(pset.id())
+    if items is None:
+        if pset.is_a("IfcPropertySet"):
+            props = pset.HasProperties or []
+        elif pset.is_a("IfcElementQuantity"):
+            props = pset.Quantities or []
+        else:
+            props = []
+        items = memo[pset.id()] = [(pset.Name, p.Name, _value(p, to_si)) for p in props]
+    return items
+
+def build_property_index(model):
+    """
+    One pass over type property sets, IfcRelDefinesByType and IfcRelDefinesByProperties:
+      - "values": {(pset, property): {element id: value}}
+      - "psets":  {property: [pset names that define it]}
+    Type values are inherited by the type's instances; a value set on the instance overrides them.
+    Quantities are converted to SI like A3.quantity_index (their own Unit, else the project unit).
+    """
+    values = defaultdict(dict)
+    memo = {}
+    to_si = quantity_scaler(model)
+
+    type_items = {}
+    for t in model.by_type("IfcTypeObject"):
+        items = [it for ps in (t.HasPropertySets or []) for it in _pset_items(ps, memo, to_si)]
+        if items:
+            type_items[t.id()] = items
+    if type_items:
+        for rel in model.by_type("IfcRelDefinesByType"):
+            items = type_items.get(rel.RelatingType.id())
+            if items is None:
+                continue
+            ids = [o.id() for o in rel.RelatedObjects]
+            for pset, name, v in items:
+                values[(pset, name)].update(dict.fromkeys(ids, v))
+
+    for rel in model.by_type("IfcRelDefinesByProperties"):
+        ids = [o.id() for o in rel.RelatedObjects]
+        for defn in property_definitions(rel.RelatingPropertyDefinition):
+            for pset, name, v in _pset_items(defn, memo, to_si):
+                values[(pset, name)].update(dict.fromkeys(ids, v))
+
+    psets = defaultdict(list)
+    for pset, name in values:
+        psets[name].append(pset)
+    return {"values": dict(values), "psets": dict(psets)}
+
+def property_values(props, name, pset=None):
+    """{element id: value} of one property; pset=None merges every pset that defines `name`."""
+    if pset is not None:
+        return props["values"].get((pset, name), {})
+    out = {}
+    for ps in props["psets"].get(name, []):
+        for eid, v in props["values"][(ps, name)].items():
+            out.setdefault(eid, v)
+    return out
+
+def select(props, name, test=None, pset=None, among=None):
+    """
+    Ids of elements whose property passes `test` (default: truthy), e.g.
+        select(props, "IsExternal", pset="Pset_DoorCommon", among=door_ids)
+    Elements without the property never match.
+    """
+    vals = property_values(props, name, pset)
+    if among is not None:
+        vals = {eid: vals[eid] for eid in among if eid in vals}
+    test = test or bool
+    return {eid for eid, v in vals.items() if v is not None and test(v)}
+
+_MINUTES = re.compile(r"(\d+)")
+# the classification digits follow the letters (EI2 60: the '2' is a sub-class, only when a space follows)
+_FIRE_CLASS = re.compile(r"\b[A-Z]*(?:\d\s+)?(\d{2,3})\b")
+
+def fire_rating_minutes(rating):
+    """
+    Fire resistance in minutes from 'EI30', 'EI2 60-Sa', 'REI 90', '30 min', 60 (None if not found).
+
+    >>> [fire_rating_minutes(r) for r in ("EI30", "EI120", "REI120", "EI2 60", "EI180-Sa", "REI 90", "30 min")]
+    [30.0, 120.0, 120.0, 60.0, 180.0, 90.0, 30.0]
+    """
+    if isinstance(rating, (int, float)):
+        return float(rating)
+    if not isinstance(rating, str):
+        return None
+    m = _FIRE_CLASS.search(rating.upper()) or _MINUTES.search(rating)
+    return float(m.group(1)) if m else None
+
+def quantity(props, name, qset, ids):
+    """{id: quantity in SI (m, m², m³)} for `ids` from an IfcElementQuantity."""
+    vals = props["values"].get((qset, name), {})
+    return {eid: vals[eid] for eid in ids if isinstance(vals.get(eid), (int, float))}
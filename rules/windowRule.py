@@ -1,9 +1,42 @@
+#hello elisa
 import ifcopenshell
+from collections import Counter
 
-def checkRule(model):
-    windows = model.by_type('IfcWindow')
+from rules.engine import context_for
+from rules.properties import fire_rating_minutes, quantity, select
+
+ENTITY_TYPES = ['IfcWindow']
+RELATIONS = ['spatial', 'properties']
+
+PSET = "Pset_WindowCommon"
+
+def checkRule(model, context=None):
+    ctx = context_for(model, context, ENTITY_TYPES, RELATIONS)
+    windows = ctx["entities"]['IfcWindow']
 
     result = f"Windows: {len(windows)}"
 
-    return result
+    # Per-storey breakdown from the shared spatial index (see A3.build_spatial_index)
+    if windows:
+        per_storey = Counter(
+            getattr(ctx["index"]["storey_of"].get(w.id()), "Name", None) or "<no storey>" for w in windows
+        )
+        result += " (" + ", ".join(f"{name}: {n}" for name, n in per_storey.items()) + ")"
+    else:
+        return result
+
+    # Property checks are lookups in the shared property index (rules.properties)
+    props = ctx["props"]
+    ids = [w.id() for w in windows]
+    external = select(props, "IsExternal", pset=PSET, among=ids)
+    fire = select(props, "FireRating", pset=PSET, among=ids, test=lambda v: fire_rating_minutes(v) is not None)
+    no_acoustic = external - select(props, "AcousticRating", pset=PSET, among=external)
+    heights = quantity(props, "Height", "Qto_WindowBaseQuantities", ids)
+    widths = quantity(props, "Width", "Qto_WindowBaseQuantities", ids)
+    area = sum(widths[i] * heights[i] for i in widths.keys() & heights.keys())
 
+    result += f" | external: {len(external)} ({len(no_acoustic)} without acoustic rating)"
+    result += f" | fire rated: {len(fire)}"
+    if widths and heights:
+        result += f" | opening area {area:.2f} m² (Qto)"
+    return result